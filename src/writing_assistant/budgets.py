@@ -0,0 +1,127 @@
+import functools
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+
+from .event_log import log_event
+from .usage_store import UsageStore
+from .user_manager import UserManager
+
+# Fraction of the daily budget after which a user is downgraded to cheaper models and smaller prompts
+SOFT_LIMIT = float(os.getenv("WRITING_ASSISTANT_BUDGET_SOFT_LIMIT", "0.8"))
+# Fraction of the daily budget after which a user's LLM calls are refused until the next UTC day
+HARD_LIMIT = float(os.getenv("WRITING_ASSISTANT_BUDGET_HARD_LIMIT", "1.0"))
+# Seconds a user's usage and budget are cached between reads; tokens billed in this process update the cache
+# right away, other processes' usage and budget changes show up after at most this long
+BUDGET_CACHE_SECONDS = float(os.getenv("WRITING_ASSISTANT_BUDGET_CACHE_SECONDS", "5"))
+
+# user -> (expires, tokens used today, daily budget)
+_budget_cache: Dict[str, Tuple[float, int, int]] = {}
+_budget_cache_lock = threading.Lock()
+_usage_store: Optional[UsageStore] = None
+
+
+class BudgetExceeded(RuntimeError):
+    """A user reached the hard limit of their daily token budget."""
+
+    def __init__(self, user: str, used: int, budget: int):
+        super().__init__(f"{user} has used {used} of {budget} daily tokens; try again tomorrow (UTC)")
+        self.user = user
+        self.used = used
+        self.budget = budget
+
+
+def scoped_to_user(node):
+    """Wrap a graph node so its config names the state's user, who is billed for its LLM calls."""
+
+    @functools.wraps(node)
+    def wrapper(state, config):
+        configurable = {**config.get("configurable", {}), "user": state.get("user")}
+        return node(state, {**config, "configurable": configurable})
+
+    return wrapper
+
+
+def config_user(config: Optional[RunnableConfig]) -> Optional[str]:
+    """The user billed for calls made with `config`, if it names a real one."""
+    user = (config or {}).get("configurable", {}).get("user")
+    return user if user and user != "None Selected" else None
+
+
+def _status(used: int, budget: int) -> str:
+    if budget and used >= budget * HARD_LIMIT:
+        return "hard"
+    if budget and used >= budget * SOFT_LIMIT:
+        return "soft"
+    return "ok"
+
+
+def usage_store() -> UsageStore:
+    """The process's usage store, pruned of old days when first opened."""
+    global _usage_store
+    if _usage_store is None:
+        store = UsageStore()
+        store.prune()
+        _usage_store = store
+    return _usage_store
+
+
+def _usage_and_budget(user: str) -> Tuple[int, int]:
+    now = time.monotonic()
+    with _budget_cache_lock:
+        cached = _budget_cache.get(user)
+    if cached and cached[0] > now:
+        return cached[1], cached[2]
+    used = usage_store().usage(user)["total"]
+    budget = UserManager().get_token_budget(user)
+    with _budget_cache_lock:
+        _budget_cache[user] = (now + BUDGET_CACHE_SECONDS, used, budget)
+    return used, budget
+
+
+def budget_status(user: Optional[str]) -> str:
+    """Where a user stands today: "ok", "soft" (over the soft limit) or "hard" (over the hard limit)."""
+    if not user:
+        return "ok"
+    return _status(*_usage_and_budget(user))
+
+
+def check_budget(config: RunnableConfig, task: str) -> str:
+    """Return the budget status of the config's user, raising BudgetExceeded at the hard limit."""
+    user = config_user(config)
+    if not user:
+        return "ok"
+    used, budget = _usage_and_budget(user)
+    status = _status(used, budget)
+    if status == "hard":
+        log_event(config, f"Refused {task}: daily token budget used up.", task=task)
+        raise BudgetExceeded(user, used, budget)
+    return status
+
+
+def record_usage(users: List[str], task: str, responses: List[Any]):
+    """Bill the tokens of `responses` to `users`, split evenly when several share a batched call."""
+    tokens = sum((getattr(response, "usage_metadata", None) or {}).get("total_tokens", 0) for response in responses)
+    users = [user for user in users if user and user != "None Selected"]
+    if not tokens or not users:
+        return
+    share = tokens // len(users)
+    for user in users:
+        usage_store().add(user, task, share)
+        with _budget_cache_lock:
+            cached = _budget_cache.get(user)
+            if cached:
+                _budget_cache[user] = (cached[0], cached[1] + share, cached[2])
+
+
+def usage_summary() -> List[Dict[str, Any]]:
+    """Rows of (user, tokens used today, budget, status) for every user, heaviest first."""
+    report = usage_store().report()
+    rows = []
+    for user, budget in UserManager().get_token_budgets().items():
+        used = report.get(user, {}).get("total", 0)
+        rows.append({"user": user, "used": used, "budget": budget or None, "status": _status(used, budget)})
+    return sorted(rows, key=lambda row: -row["used"])
@@ -2,6 +2,7 @@ from typing import Dict, Any, List, TypedDict
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import InMemorySaver
 
+from .budgets import scoped_to_user
 from .chat_state import ChatState
 from .nodes.draft_node import draft_node
 from .nodes.feedback_node import human_approval
@@ -9,20 +10,22 @@ from .nodes.revisor_node import revisor_node
 from .nodes.memory_node import memory_extraction_node
 from .nodes.confirm_memories_node import confirm_memories_node
 from .nodes.memory_selector_node import memory_selector_node
+from .profiling import profile_node, profile_serializer
 
-def create_chat_graph():
-    """Create a simple LangGraph for chat interactions"""
+def create_chat_graph(checkpointer=None):
+    """Create a simple LangGraph for chat interactions (in-memory checkpoints unless given a checkpointer)"""
     
     # Create the graph
     workflow = StateGraph(ChatState)
     
     # Add the nodes
-    workflow.add_node("memory_selector", memory_selector_node)
-    workflow.add_node("draft", draft_node)
-    workflow.add_node("human_feedback", human_approval)
-    workflow.add_node("revisor", revisor_node)
-    workflow.add_node("memory_extraction", memory_extraction_node)
-    workflow.add_node("confirm_memories", confirm_memories_node)
+    # Every node bills its LLM calls to the state's user; profiling wraps only when WRITING_ASSISTANT_PROFILE is set
+    workflow.add_node("memory_selector", profile_node("memory_selector", scoped_to_user(memory_selector_node)))
+    workflow.add_node("draft", profile_node("draft", scoped_to_user(draft_node)))
+    workflow.add_node("human_feedback", profile_node("human_feedback", scoped_to_user(human_approval)))
+    workflow.add_node("revisor", profile_node("revisor", scoped_to_user(revisor_node)))
+    workflow.add_node("memory_extraction", profile_node("memory_extraction", scoped_to_user(memory_extraction_node)))
+    workflow.add_node("confirm_memories", profile_node("confirm_memories", scoped_to_user(confirm_memories_node)))
 
     # Set the entry point
     workflow.set_entry_point("memory_selector")
@@ -31,10 +34,10 @@ def create_chat_graph():
     workflow.add_edge("memory_selector", "draft")
     workflow.add_edge("draft", "human_feedback")
     workflow.add_edge("revisor", "human_feedback")
-    workflow.add_edge("memory_extraction", "confirm_memories")
     workflow.add_edge("confirm_memories", END)
     
-    checkpointer = InMemorySaver()
+    if checkpointer is None:
+        checkpointer = InMemorySaver(serde=profile_serializer())
     graph = workflow.compile(checkpointer=checkpointer)
 
     return graph
@@ -48,8 +51,11 @@ def initialize_chat_state() -> ChatState:
         "past_revisions": [],
         "original_request": "",
         "feedback": "",
-        "action_log": [],
         "memories": [],
         "suggested_memories": [],
-        "applicable_memories": []
+        "applicable_memories": [],
+        "long_document": False,
+        "sections": [],
+        "num_candidates": 1,
+        "candidate_drafts": []
     }
@@ -1,13 +1,20 @@
-from typing import Dict, List, TypedDict
+from typing import Any, Dict, List, TypedDict
 
 class ChatState(TypedDict):
     user: str
     messages: List[Dict[str, str]]
     current_draft: str
-    past_revisions: List[Dict[str, str]]
+    # Base draft plus deltas, see revision_store
+    past_revisions: List[Dict[str, Any]]
     original_request: str
     feedback: str
-    action_log: List[str]
+    # Memory IDs, resolved to text through UserManager.get_memory_index
     memories: List[str]
+    # New memory text, not saved (or given an ID) until the user confirms it
     suggested_memories: List[str]
-    applicable_memories: List[str]
\ No newline at end of file
+    # Memory IDs
+    applicable_memories: List[str]
+    long_document: bool
+    sections: List[Dict[str, str]]
+    num_candidates: int
+    candidate_drafts: List[str]
\ No newline at end of file
@@ -0,0 +1,88 @@
+import contextvars
+import os
+import threading
+from collections import Counter
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from .event_log import log_event
+
+# Seconds allowed per LLM call, keyed by router task
+DEFAULT_DEADLINES: Dict[str, float] = {
+    "select": 10,
+    "draft": 60,
+    "revise": 30,
+    "extract": 20,
+    "outline": 20,
+    "section_target": 10,
+    "section": 90,
+}
+
+
+def _load_deadlines() -> Dict[str, float]:
+    """Default deadlines, overridden by WRITING_ASSISTANT_DEADLINES like "select=5,revise=20" (0 disables)."""
+    deadlines = dict(DEFAULT_DEADLINES)
+    for item in os.getenv("WRITING_ASSISTANT_DEADLINES", "").split(","):
+        if "=" in item:
+            task, seconds = item.split("=", 1)
+            deadlines[task.strip()] = float(seconds)
+    return deadlines
+
+
+DEADLINES = _load_deadlines()
+
+_fallback_counts: Counter = Counter()
+_fallback_lock = threading.Lock()
+
+
+class DeadlineExceeded(TimeoutError):
+    """An LLM call did not finish within its task's deadline."""
+
+    def __init__(self, task: str, seconds: float):
+        super().__init__(f"{task} did not finish within {seconds:g}s")
+        self.task = task
+        self.seconds = seconds
+
+
+def deadline_for(task: str) -> Optional[float]:
+    """Seconds allowed for a task's calls, or None if it has no deadline."""
+    return DEADLINES.get(task) or None
+
+
+def call_with_deadline(task: str, seconds: Optional[float], fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run `fn` and give up waiting after `seconds`, raising DeadlineExceeded."""
+    if not seconds:
+        return fn(*args, **kwargs)
+    # Copy the context so tracing and callback context vars follow the call into the worker thread
+    context = contextvars.copy_context()
+    future: Future = Future()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(context.run(fn, *args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    # One thread per call rather than a shared pool: no call waits in a queue behind others, so the
+    # deadline covers only the call itself. A stalled call finishes (or hits its HTTP timeout) on its own.
+    threading.Thread(target=run, name=f"deadline-{task}", daemon=True).start()
+    try:
+        return future.result(timeout=seconds)
+    except FutureTimeoutError:
+        raise DeadlineExceeded(task, seconds)
+
+
+def record_fallback(config: RunnableConfig, task: str, fallback: str):
+    """Log a deadline fallback on the thread and count it."""
+    with _fallback_lock:
+        _fallback_counts[(task, fallback)] += 1
+    log_event(config, f"{task} missed its deadline; falling back to {fallback}.", task=task, fallback=fallback)
+
+
+def fallback_stats() -> Dict[str, int]:
+    """Fallback counts in this process, keyed by "task:fallback"."""
+    with _fallback_lock:
+        return {f"{task}:{fallback}": count for (task, fallback), count in _fallback_counts.items()}
@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CAPACITY = int(os.getenv("WRITING_ASSISTANT_EVENT_LOG_SIZE", "200"))
+SPILL_DIR = os.getenv("WRITING_ASSISTANT_EVENT_LOG_DIR")
+MAX_THREADS = 256
+
+
+class EventLog:
+    """Bounded ring buffer of structured events for one graph thread."""
+
+    def __init__(self, thread_id: str, capacity: int = DEFAULT_CAPACITY, spill_dir: Optional[str] = SPILL_DIR):
+        self.thread_id = thread_id
+        self._events = deque(maxlen=capacity)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._spill_path = None
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._spill_path = os.path.join(spill_dir, f"{thread_id}.jsonl")
+
+    def append(self, message: str, source: str = "graph", **data) -> Dict[str, Any]:
+        """Record an event, spilling it to disk if a spill directory is configured."""
+        with self._lock:
+            self._seq += 1
+            event = {"seq": self._seq, "ts": time.time(), "source": source, "message": message}
+            if data:
+                event["data"] = data
+            self._events.append(event)
+            if self._spill_path:
+                with open(self._spill_path, 'a') as f:
+                    f.write(json.dumps(event, default=str) + "\n")
+        return event
+
+    def record(self, events: List[Dict[str, Any]]):
+        """Add events that were logged (and spilled) in another process, e.g. a graph worker."""
+        with self._lock:
+            for event in events:
+                self._seq += 1
+                self._events.append({**event, "seq": self._seq})
+
+    def query(self, source: Optional[str] = None, contains: Optional[str] = None,
+              since_seq: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return buffered events, oldest first, matching the given filters."""
+        with self._lock:
+            events = list(self._events)
+        if source:
+            events = [e for e in events if e["source"] == source]
+        if contains:
+            needle = contains.lower()
+            events = [e for e in events if needle in e["message"].lower()]
+        if since_seq:
+            events = [e for e in events if e["seq"] > since_seq]
+        if limit:
+            events = events[-limit:]
+        return events
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+_logs: "OrderedDict[str, EventLog]" = OrderedDict()
+_logs_lock = threading.Lock()
+
+
+def get_event_log(thread_id) -> EventLog:
+    """Get the event log for a thread, creating it if it doesn't exist."""
+    thread_id = str(thread_id)
+    with _logs_lock:
+        log = _logs.get(thread_id)
+        if log is None:
+            log = _logs[thread_id] = EventLog(thread_id)
+            # Evict the least recently used threads so the registry stays bounded too
+            while len(_logs) > MAX_THREADS:
+                _logs.popitem(last=False)
+        else:
+            _logs.move_to_end(thread_id)
+        return log
+
+
+def drop_event_log(thread_id):
+    """Forget the in-memory log of a finished thread (spilled events are kept)."""
+    with _logs_lock:
+        _logs.pop(str(thread_id), None)
+
+
+def log_event(config: Dict[str, Any], message: str, source: str = "graph", **data) -> Dict[str, Any]:
+    """Append an event to the log of the thread identified by a graph config.
+
+    The config of a call made for several threads at once lists them under "thread_ids" instead.
+    """
+    configurable = config.get("configurable", {})
+    thread_ids = configurable.get("thread_ids") or [configurable.get("thread_id", "default")]
+    events = [get_event_log(thread_id).append(message, source=source, **data) for thread_id in thread_ids]
+    return events[0]
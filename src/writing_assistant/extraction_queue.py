@@ -0,0 +1,82 @@
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+from . import sqlite_db
+
+QUEUE_PATH = os.getenv("WRITING_ASSISTANT_EXTRACTION_QUEUE", "data/extraction_queue.db")
+DEFERRED_EXTRACTION = os.getenv("WRITING_ASSISTANT_DEFERRED_EXTRACTION", "").lower() in ("1", "true", "yes")
+MAX_ATTEMPTS = 3
+# Claimed jobs not completed within this many seconds are assumed lost (e.g. a crashed worker)
+CLAIM_TIMEOUT = 600
+
+
+class ExtractionQueue:
+    """Durable SQLite queue of completed sessions waiting for memory extraction."""
+
+    def __init__(self, path: str = QUEUE_PATH):
+        self.path = path
+        with sqlite_db.connection(self.path) as connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created REAL NOT NULL,
+                    claimed REAL,
+                    error TEXT
+                )
+                """
+            )
+            # Queues from before completed jobs were deleted still hold them
+            connection.execute("DELETE FROM jobs WHERE status = 'done'")
+
+    def enqueue(self, user: str, session: Dict[str, Any]) -> int:
+        """Queue a finished session (original_request, past_revisions, feedback, current_draft)."""
+        with sqlite_db.connection(self.path) as connection:
+            cursor = connection.execute(
+                "INSERT INTO jobs (user, payload, created) VALUES (?, ?, ?)",
+                (user, json.dumps(session), time.time()),
+            )
+            return cursor.lastrowid
+
+    def claim(self, limit: int) -> List[Dict[str, Any]]:
+        """Atomically claim up to `limit` pending jobs, oldest first."""
+        with sqlite_db.connection(self.path) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            connection.execute(
+                "UPDATE jobs SET status = 'pending' WHERE status = 'claimed' AND claimed < ?",
+                (now - CLAIM_TIMEOUT,),
+            )
+            rows = connection.execute(
+                "SELECT id, user, payload FROM jobs WHERE status = 'pending' ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+            connection.executemany(
+                "UPDATE jobs SET status = 'claimed', claimed = ?, attempts = attempts + 1 WHERE id = ?",
+                [(now, row[0]) for row in rows],
+            )
+            connection.execute("COMMIT")
+        return [{"id": row[0], "user": row[1], "session": json.loads(row[2])} for row in rows]
+
+    def complete(self, job_ids: List[int]):
+        """Delete finished jobs; their memories are in the users file now."""
+        with sqlite_db.connection(self.path) as connection:
+            connection.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in job_ids])
+
+    def fail(self, job_ids: List[int], error: str):
+        """Return jobs to the queue, or mark them failed after MAX_ATTEMPTS."""
+        with sqlite_db.connection(self.path) as connection:
+            connection.executemany(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ? WHERE id = ?",
+                [(MAX_ATTEMPTS, error, i) for i in job_ids],
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with sqlite_db.connection(self.path) as connection:
+            return dict(connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
@@ -0,0 +1,150 @@
+import argparse
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from .event_log import log_event
+from .extraction_queue import QUEUE_PATH, ExtractionQueue
+from .feedback_classifier import record_extraction_result
+from .model_router import invoke_routed
+from .nodes.memory_node import (
+    CAPTURE_SECTION,
+    EXAMPLES_SECTION,
+    INPUTS_SECTION,
+    QUALITY_BAR_SECTION,
+    format_extraction_inputs,
+)
+from .user_manager import UserManager
+
+WORKER_CONFIG = {"configurable": {"thread_id": "extraction-worker"}}
+
+
+class SessionMemories(BaseModel):
+    """Memories extracted from one session of a batch"""
+    session: int = Field(description="The session number as given in the input.")
+    memories: List[str] = Field(description="New memory statements for this session. Empty if no solid new insight.")
+
+
+class BatchMemoryExtraction(BaseModel):
+    """Structured output for extracting memories from several sessions at once"""
+    sessions: List[SessionMemories] = Field(description="One entry per input session, in any order.")
+
+
+BATCH_ROLE_SECTION = """
+# System role
+
+You are ContextCraft's Memory Miner. Below are several independent revision cycles, possibly from different users. For each session separately, extract 0-3 new, actionable, context-rich memory statements about that user's preferences that will improve future drafts. Never carry insights from one session into another.
+
+The memories should be appropriately generalized. For example, if you get feedback on a thank you note written to a neighbor, the memory should be about "casual notes," not "notes to neighbors."
+
+"""
+
+BATCH_OUTPUT_SECTION = """# Output format
+
+You are tool-bound. Return only the tool call for BatchMemoryExtraction with one entry per session: its session number and a memories: List[str].
+If a session has no solid new insight, return an empty list for it.
+
+"""
+
+BATCH_PROMPT = BATCH_ROLE_SECTION + QUALITY_BAR_SECTION + CAPTURE_SECTION + BATCH_OUTPUT_SECTION + EXAMPLES_SECTION + """
+# Sessions
+
+{sessions}
+"""
+
+
+def extract_batch(jobs: List[Dict[str, Any]]) -> Dict[int, List[str]]:
+    """Extract memories for several queued sessions with a single LLM call. Returns memories by job ID."""
+    sessions_text = "\n".join([
+        f"## Session {number}\n\n" + INPUTS_SECTION.format(**format_extraction_inputs(job["session"]))
+        for number, job in enumerate(jobs, 1)
+    ])
+    prompt = BATCH_PROMPT.format(sessions=sessions_text)
+    response = invoke_routed("extract", WORKER_CONFIG, prompt, tools=[BatchMemoryExtraction],
+                             max_tokens=300 * len(jobs), deadline=0, bill_to=[job["user"] for job in jobs])
+    results = {job["id"]: [] for job in jobs}
+    for entry in response.tool_calls[0]["args"]["sessions"]:
+        if 1 <= entry["session"] <= len(jobs):
+            results[jobs[entry["session"] - 1]["id"]] = entry["memories"]
+    return results
+
+
+class ExtractionWorkerPool:
+    """Threads that drain the queue in batches and store results as pending memories."""
+
+    def __init__(self, queue: Optional[ExtractionQueue] = None, workers: int = 2, batch_size: int = 4,
+                 poll_interval: float = 5.0, user_manager: Optional[UserManager] = None):
+        self.queue = queue or ExtractionQueue()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.user_manager = user_manager or UserManager()
+        self._stop_event = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"extraction-worker-{i}", daemon=True) for i in range(workers)
+        ]
+
+    def start(self) -> "ExtractionWorkerPool":
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join()
+
+    def process_once(self) -> int:
+        """Claim and process one batch. Returns the number of jobs handled."""
+        jobs = self.queue.claim(self.batch_size)
+        if not jobs:
+            return 0
+        try:
+            results = extract_batch(jobs)
+        except Exception as e:
+            self.queue.fail([job["id"] for job in jobs], f"{type(e).__name__}: {e}")
+            log_event(WORKER_CONFIG, f"Batch of {len(jobs)} extractions failed.", error=str(e))
+            return len(jobs)
+        for job in jobs:
+            record_extraction_result(bool(results[job["id"]]))
+            if results[job["id"]]:
+                self.user_manager.add_pending_memories(job["user"], results[job["id"]])
+        self.queue.complete([job["id"] for job in jobs])
+        log_event(WORKER_CONFIG, f"Extracted memories for {len(jobs)} queued sessions in one call.")
+        return len(jobs)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if not self.process_once():
+                self._stop_event.wait(self.poll_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process deferred memory extractions.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--poll-interval", type=float, default=5.0)
+    parser.add_argument("--once", action="store_true", help="Drain the queue and exit.")
+    parser.add_argument("--queue", default=QUEUE_PATH)
+    parser.add_argument("--users-file", help="Defaults to $WRITING_ASSISTANT_USERS_FILE or data/users.json.")
+    args = parser.parse_args()
+
+    pool = ExtractionWorkerPool(ExtractionQueue(args.queue), workers=args.workers, batch_size=args.batch_size,
+                                poll_interval=args.poll_interval, user_manager=UserManager(args.users_file))
+    if args.once:
+        while pool.process_once():
+            pass
+        print(pool.queue.stats())
+        return
+    pool.start()
+    try:
+        while True:
+            time.sleep(60)
+            print(pool.queue.stats())
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import math
+import random
+import re
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+LOREM = (
+    "Thanks for the update. We have reviewed the plan and the team is aligned on next steps. "
+    "The main change is the revised timeline, which keeps the launch on track while we finish testing. "
+    "Please reply with any questions and we will follow up by the end of the week."
+)
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Parse a latency spec into a sampler returning seconds.
+
+    Supported specs (milliseconds): "fixed:MS", "uniform:LO,HI",
+    "lognormal:MEDIAN,SIGMA" and "exp:MEAN".
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(",") if value]
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1]) / 1000
+    if kind == "exp":
+        return lambda: random.expovariate(1 / values[0]) / 1000
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+def _default_tool_args(name: str, prompt: str) -> Dict[str, Any]:
+    """Plausible tool-call arguments for the structured outputs the nodes use."""
+    if name == "MemorySelection":
+        available = prompt.split("**Available Memories (one per line, ID first):**", 1)[-1].split("# Output", 1)[0]
+        memory_ids = re.findall(r"^- \[(\w+)\] ", available, flags=re.MULTILINE)
+        return {"applicable_memory_ids": memory_ids[:3]}
+    if name == "BatchMemorySelection":
+        requests = re.split(r"^## Request (\d+)$", prompt, flags=re.MULTILINE)[1:]
+        return {"selections": [
+            {"request": int(number), "applicable_memory_ids": re.findall(r"^- \[(\w+)\] ", text, flags=re.MULTILINE)[:3]}
+            for number, text in zip(requests[::2], requests[1::2])
+        ]}
+    if name == "MemoryExtraction":
+        return {"memories": ["For routine updates, prefers concise drafts that lead with the outcome."]}
+    if name == "BatchMemoryExtraction":
+        sessions = re.findall(r"^## Session (\d+)$", prompt, flags=re.MULTILINE)
+        return {"sessions": [
+            {"session": int(number), "memories": ["For routine updates, prefers concise drafts that lead with the outcome."]}
+            for number in sessions
+        ]}
+    if name == "DocumentOutline":
+        return {"sections": [{"title": f"Part {i}", "brief": "Covers one part of the request."} for i in range(1, 4)]}
+    if name == "SectionTargets":
+        return {"section_numbers": [1]}
+    return {}
+
+
+class FakeChatModel(BaseChatModel):
+    """Local stand-in for ChatOpenAI with configurable latency and tool-call responses."""
+
+    model_name: str = "fake"
+    latency: Callable[[], float] = lambda: 0.0
+    tool_responses: Dict[str, Dict[str, Any]] = {}
+    draft_text: str = LOREM
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency())
+        prompt = "\n".join([str(message.content) for message in messages])
+
+        tool_calls = []
+        content = ""
+        tools = kwargs.get("tools")
+        if tools:
+            name = tools[0]["function"]["name"]
+            args = self.tool_responses.get(name) or _default_tool_args(name, prompt)
+            tool_calls.append({"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"})
+        else:
+            content = self.draft_text
+
+        # Roughly four characters per token, like English text with OpenAI tokenizers
+        input_tokens = len(prompt) // 4
+        output_tokens = max(1, len(content or str(tool_calls)) // 4)
+        message = AIMessage(
+            content=content,
+            tool_calls=tool_calls,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+            response_metadata={"model_name": self.model_name},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
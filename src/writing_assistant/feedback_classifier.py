@@ -0,0 +1,112 @@
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Skip memory extraction when no feedback in the session carries stylistic or structural signal
+SKIP_TRIVIAL_FEEDBACK = os.getenv("WRITING_ASSISTANT_SKIP_TRIVIAL_FEEDBACK", "true").lower() in ("1", "true", "yes")
+
+# Word weights of the scorer: positive words point at style or structure, negative ones at one-off corrections.
+# Words are matched by prefix, so "formal" also covers "formality" and "formally".
+WORD_WEIGHTS: Dict[str, float] = {
+    # Tone and voice
+    "tone": 2, "formal": 2, "informal": 2, "casual": 2, "friendly": 2, "warm": 1.5, "professional": 2, "polite": 1.5,
+    "humble": 1.5, "confident": 1.5, "assertive": 1.5, "upbeat": 1.5, "enthusias": 1.5, "empath": 1.5,
+    "apolog": 1, "voice": 1.5, "personal": 1, "playful": 1.5, "serious": 1.5, "stiff": 1.5, "robotic": 1.5,
+    "salesy": 1.5, "jargon": 1.5, "simpl": 1, "plain": 1, "emoji": 2, "exclamation": 2,
+    # Length and structure
+    "short": 2, "long": 1.5, "concise": 2, "brief": 2, "wordy": 2, "verbose": 2, "length": 1.5, "words": 1,
+    "bullet": 2, "list": 1, "heading": 2, "header": 1.5, "section": 1.5, "paragraph": 1.5, "structure": 2,
+    "format": 1.5, "order": 1, "lead": 1, "open": 1, "clos": 1, "sign-off": 1.5, "greeting": 1.5,
+    "subject": 1.5, "cta": 2, "call": 0.5, "summary": 1, "tldr": 1.5, "intro": 1, "outro": 1,
+    # Content emphasis
+    "emphas": 1.5, "focus": 1, "highlight": 1, "detail": 1, "example": 1, "options": 1, "avoid": 1,
+    "never": 1, "always": 1, "style": 2, "fluff": 2, "filler": 2, "generic": 1.5, "cliche": 1.5,
+    # One-off corrections
+    "typo": -3, "spell": -2, "misspel": -3, "grammar": -1.5, "punctuation": -1, "comma": -1,
+    "date": -2, "day": -1, "time": -1, "name": -1.5, "number": -1, "price": -1.5, "address": -1.5,
+    "phone": -1.5, "email": -0.5, "link": -1.5, "url": -1.5, "wrong": -1, "incorrect": -1.5, "fix": -1,
+    "correct": -1, "instead": -0.5, "looks": -1, "good": -1, "great": -1, "perfect": -1.5, "thanks": -1,
+}
+
+# Phrases that carry a clear preference even when the words alone would not
+STYLE_PATTERN = re.compile(
+    r"\b(more|less|too|not so|way too)\s+\w+|\bkeep it\b|\bsound(s)?\b|\bread(s)? like\b|\bunder \d+ words\b|\bi (prefer|like|hate|want)\b",
+    re.IGNORECASE,
+)
+# Corrections of specific facts: "change 3pm to 4pm", "it's Tuesday not Monday", bare dates and times
+CORRECTION_PATTERN = re.compile(
+    r"\b(change|replace|swap)\b.+\bto\b.+|\bnot\b \w+day\b|\b\d{1,2}(:\d{2})?\s*(am|pm)\b|\b\d{1,2}/\d{1,2}\b",
+    re.IGNORECASE,
+)
+PHRASE_WEIGHT = 2.0
+CORRECTION_WEIGHT = -2.0
+# Feedback at least this long almost always says something about style, whatever the words
+LONG_FEEDBACK_WORDS = 25
+# Feedback this short with no known words ("ok", "done") is treated as no signal
+SHORT_FEEDBACK_WORDS = 3
+
+_stats: Counter = Counter()
+_stats_lock = threading.Lock()
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"[a-z][a-z'-]*", text.lower())
+
+
+def score_feedback(feedback: str) -> float:
+    """Score one feedback string: above 0 means stylistic or structural signal, below 0 a one-off correction."""
+    counts = Counter(_tokens(feedback))
+    score = 0.0
+    for token, count in counts.items():
+        # Longest matching prefix wins, so "longer" uses "long" and "misspelled" uses "misspel"
+        prefixes = [prefix for prefix in WORD_WEIGHTS if token.startswith(prefix)]
+        if prefixes:
+            score += WORD_WEIGHTS[max(prefixes, key=len)] * count
+    score += PHRASE_WEIGHT * len(STYLE_PATTERN.findall(feedback))
+    score += CORRECTION_WEIGHT * len(CORRECTION_PATTERN.findall(feedback))
+    return score
+
+
+def classify_feedback(feedbacks: List[str]) -> Tuple[bool, str]:
+    """Decide whether a session's feedback is worth mining for memories. Returns (has_signal, reason)."""
+    feedbacks = [feedback.strip() for feedback in feedbacks if feedback and feedback.strip()]
+    if not feedbacks:
+        return False, "no feedback"
+    scores = []
+    for feedback in feedbacks:
+        words = len(_tokens(feedback))
+        if words >= LONG_FEEDBACK_WORDS:
+            return True, f"long feedback ({words} words)"
+        score = score_feedback(feedback)
+        if score > 0:
+            return True, f"style signal (score {score:g})"
+        if score == 0 and words > SHORT_FEEDBACK_WORDS:
+            # Unknown words: extract rather than risk missing a preference
+            return True, "unrecognized feedback"
+        scores.append(score)
+    return False, f"no stylistic signal (best score {max(scores):g})"
+
+
+def record_decision(has_signal: bool):
+    with _stats_lock:
+        _stats["checked"] += 1
+        _stats["skipped" if not has_signal else "extracted"] += 1
+
+
+def record_extraction_result(found_memories: bool):
+    """Count whether an extraction the classifier let through produced any memories."""
+    with _stats_lock:
+        _stats["hits" if found_memories else "misses"] += 1
+
+
+def classifier_stats() -> Dict[str, float]:
+    """Decision counts in this process, with the skip rate and the hit rate of extractions that ran."""
+    with _stats_lock:
+        stats = dict(_stats)
+    checked = stats.get("checked", 0)
+    finished = stats.get("hits", 0) + stats.get("misses", 0)
+    stats["skip_rate"] = stats.get("skipped", 0) / checked if checked else 0.0
+    stats["hit_rate"] = stats.get("hits", 0) / finished if finished else 0.0
+    return stats
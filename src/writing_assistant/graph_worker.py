@@ -0,0 +1,297 @@
+"""Run the chat graph on worker processes that share a durable SQLite checkpointer.
+
+The UI submits start/resume jobs through GraphClient, which has the same
+invoke() signature as the compiled graph, and polls for the result. Workers
+can run inside the app (GraphWorkerPool) or separately:
+
+    python -m writing_assistant.graph_worker --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.types import Command, Interrupt
+
+from . import sqlite_db
+from .chat_graph import create_chat_graph
+from .event_log import get_event_log
+from .profiling import profile_serializer
+from .user_manager import flush_memory_usage
+
+GRAPH_DB = os.getenv("WRITING_ASSISTANT_GRAPH_DB", "data/graph.db")
+# Jobs each worker process runs at once; most of a job is spent waiting on the LLM
+THREADS_PER_WORKER = int(os.getenv("WRITING_ASSISTANT_GRAPH_WORKER_THREADS", "4"))
+# Running jobs older than this are assumed lost with their worker and run again
+JOB_TIMEOUT = 900
+# Seconds between sweeps that requeue lost jobs and delete old abandoned ones
+RECLAIM_INTERVAL = 60
+# Seconds GraphClient waits for a job before giving up (e.g. no workers are running)
+CLIENT_TIMEOUT = float(os.getenv("WRITING_ASSISTANT_GRAPH_CLIENT_TIMEOUT", "180"))
+
+_serde = JsonPlusSerializer()
+
+
+def durable_checkpointer(path: str = GRAPH_DB) -> SqliteSaver:
+    """A checkpointer every worker process can share, so any worker can resume any thread."""
+    return SqliteSaver(sqlite_db.connect(path), serde=profile_serializer())
+
+
+class GraphJobTimeout(TimeoutError):
+    """A graph job did not finish within the client's timeout."""
+
+    def __init__(self, job_id: int, seconds: float):
+        super().__init__(f"Graph job {job_id} did not finish within {seconds:g}s")
+        self.job_id = job_id
+        self.seconds = seconds
+
+
+class GraphJobQueue:
+    """SQLite table of graph invocations. Jobs of one thread run one at a time, in order.
+
+    A job is pending, running, done or failed; a running job the client stopped waiting for is abandoned.
+    """
+
+    _CLAIMABLE = """
+        SELECT id, thread_id, payload_type, payload FROM graph_jobs
+        WHERE status = 'pending'
+          AND thread_id NOT IN (SELECT thread_id FROM graph_jobs WHERE status IN ('running', 'abandoned'))
+        ORDER BY id LIMIT 1
+    """
+
+    def __init__(self, path: str = GRAPH_DB):
+        self.path = path
+        # Workers and clients poll from the same few threads; each keeps one connection
+        self._local = threading.local()
+        self._next_reclaim = 0.0
+        with sqlite_db.connection(self.path) as connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS graph_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    thread_id TEXT NOT NULL,
+                    payload_type TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    created REAL NOT NULL,
+                    claimed REAL,
+                    result_type TEXT,
+                    result BLOB,
+                    error TEXT
+                )
+                """
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = sqlite_db.connect(self.path)
+        return connection
+
+    def _reclaim(self, connection: sqlite3.Connection, now: float):
+        """Requeue running jobs whose worker was lost and delete abandoned jobs nobody finished."""
+        connection.execute(
+            "UPDATE graph_jobs SET status = 'pending' WHERE status = 'running' AND claimed < ?",
+            (now - JOB_TIMEOUT,),
+        )
+        connection.execute("DELETE FROM graph_jobs WHERE status = 'abandoned' AND claimed < ?", (now - JOB_TIMEOUT,))
+
+    def submit(self, thread_id: str, graph_input: Any) -> int:
+        """Queue a new state to start a thread, or a Command to resume it."""
+        payload = {"resume": graph_input.resume} if isinstance(graph_input, Command) else {"input": graph_input}
+        payload_type, payload_bytes = _serde.dumps_typed(payload)
+        cursor = self._connection().execute(
+            "INSERT INTO graph_jobs (thread_id, payload_type, payload, created) VALUES (?, ?, ?, ?)",
+            (str(thread_id), payload_type, payload_bytes, time.time()),
+        )
+        return cursor.lastrowid
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically claim the oldest pending job whose thread has nothing running."""
+        connection = self._connection()
+        now = time.time()
+        if now >= self._next_reclaim:
+            self._next_reclaim = now + RECLAIM_INTERVAL
+            self._reclaim(connection, now)
+        # Idle polls only read; the write lock is taken once there is a job to claim
+        if connection.execute(self._CLAIMABLE).fetchone() is None:
+            return None
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(self._CLAIMABLE).fetchone()
+            if row:
+                connection.execute("UPDATE graph_jobs SET status = 'running', claimed = ? WHERE id = ?", (now, row[0]))
+        if row is None:
+            return None
+        return {"id": row[0], "thread_id": row[1], "payload": _serde.loads_typed((row[2], row[3]))}
+
+    def finish(self, job_id: int, result: Dict[str, Any], error: Optional[str] = None):
+        result_type, result_bytes = _serde.dumps_typed(result)
+        connection = self._connection()
+        updated = connection.execute(
+            "UPDATE graph_jobs SET status = ?, result_type = ?, result = ?, error = ? WHERE id = ? AND status = 'running'",
+            ("failed" if error else "done", result_type, result_bytes, error, job_id),
+        ).rowcount
+        if not updated:
+            # The client gave up on this job; nobody will take the result
+            connection.execute("DELETE FROM graph_jobs WHERE id = ?", (job_id,))
+
+    def abandon(self, job_id: int):
+        """Drop a job the client stopped waiting for: pending jobs never run, running ones are discarded when done."""
+        connection = self._connection()
+        connection.execute("DELETE FROM graph_jobs WHERE id = ? AND status IN ('pending', 'done', 'failed')", (job_id,))
+        connection.execute("UPDATE graph_jobs SET status = 'abandoned' WHERE id = ? AND status = 'running'", (job_id,))
+
+    def take(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Return and delete a finished job, or None while it is still pending or running."""
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT status, result_type, result, error FROM graph_jobs WHERE id = ? AND status IN ('done', 'failed')",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        connection.execute("DELETE FROM graph_jobs WHERE id = ?", (job_id,))
+        return {"status": row[0], "result": _serde.loads_typed((row[1], row[2])), "error": row[3]}
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._connection().execute("SELECT status, COUNT(*) FROM graph_jobs GROUP BY status").fetchall())
+
+
+def run_job(graph, job: Dict[str, Any]) -> Dict[str, Any]:
+    """Invoke the graph for one job and package the state, interrupts and new action-log events."""
+    thread_id = job["thread_id"]
+    log = get_event_log(thread_id)
+    seen = log.query()
+    since_seq = seen[-1]["seq"] if seen else 0
+
+    payload = job["payload"]
+    graph_input = Command(resume=payload["resume"]) if "resume" in payload else payload["input"]
+    result, error = {}, None
+    try:
+        state = graph.invoke(graph_input, config={"configurable": {"thread_id": thread_id}})
+        result["state"] = {key: value for key, value in state.items() if key != "__interrupt__"}
+        result["interrupts"] = [{"value": i.value, "id": i.id} for i in state.get("__interrupt__", [])]
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    result["events"] = log.query(since_seq=since_seq)
+    return {"result": result, "error": error}
+
+
+def _process_jobs(graph, queue: GraphJobQueue, poll_interval: float, max_poll_interval: float, stop_event):
+    delay = poll_interval
+    while stop_event is None or not stop_event.is_set():
+        job = queue.claim()
+        if job is None:
+            # Back off while idle so idle workers don't compete with the checkpointer for the database
+            time.sleep(delay)
+            delay = min(delay * 1.5, max_poll_interval)
+            continue
+        delay = poll_interval
+        outcome = run_job(graph, job)
+        queue.finish(job["id"], outcome["result"], outcome["error"])
+
+
+def run_worker(path: str = GRAPH_DB, threads: int = THREADS_PER_WORKER, poll_interval: float = 0.02,
+               max_poll_interval: float = 0.25, stop_event=None, initializer: Optional[Callable] = None, initargs: tuple = ()):
+    """Process jobs on `threads` threads until `stop_event` is set. This is the body of each worker process."""
+    if initializer:
+        initializer(*initargs)
+    graph = create_chat_graph(checkpointer=durable_checkpointer(path))
+    queue = GraphJobQueue(path)
+    runners = [
+        threading.Thread(target=_process_jobs, args=(graph, queue, poll_interval, max_poll_interval, stop_event),
+                         daemon=True)
+        for _ in range(threads)
+    ]
+    for runner in runners:
+        runner.start()
+    for runner in runners:
+        runner.join()
+    # multiprocessing children exit without running atexit handlers
+    flush_memory_usage()
+
+
+class GraphWorkerPool:
+    """Worker processes executing graph jobs, so graph work scales across cores."""
+
+    def __init__(self, workers: int, path: str = GRAPH_DB, threads: int = THREADS_PER_WORKER,
+                 initializer: Optional[Callable] = None, initargs: tuple = ()):
+        # Spawn rather than fork: the parent (e.g. Streamlit) is multi-threaded
+        context = multiprocessing.get_context("spawn")
+        self._stop_event = context.Event()
+        self._processes = [
+            context.Process(target=run_worker, args=(path, threads),
+                            kwargs={"stop_event": self._stop_event, "initializer": initializer, "initargs": initargs},
+                            name=f"graph-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+    def start(self) -> "GraphWorkerPool":
+        for process in self._processes:
+            process.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        for process in self._processes:
+            process.join()
+
+
+class GraphClient:
+    """Stand-in for the compiled graph whose invoke() runs on the graph workers."""
+
+    def __init__(self, queue: Optional[GraphJobQueue] = None, poll_interval: float = 0.01, max_poll_interval: float = 0.1,
+                 timeout: float = CLIENT_TIMEOUT):
+        self.queue = queue or GraphJobQueue()
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout
+
+    def invoke(self, graph_input: Any, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a job on the workers and return its state, raising GraphJobTimeout after `timeout` seconds."""
+        thread_id = str(config["configurable"]["thread_id"])
+        job_id = self.queue.submit(thread_id, graph_input)
+        deadline = time.monotonic() + self.timeout
+        delay = self.poll_interval
+        while (job := self.queue.take(job_id)) is None:
+            if time.monotonic() >= deadline:
+                self.queue.abandon(job_id)
+                raise GraphJobTimeout(job_id, self.timeout)
+            time.sleep(delay)
+            delay = min(delay * 1.5, self.max_poll_interval)
+
+        result = job["result"]
+        # Graph events were logged in the worker process; mirror them in this process's action log
+        get_event_log(thread_id).record(result["events"])
+        if job["status"] == "failed":
+            raise RuntimeError(f"Graph job {job_id} failed: {job['error']}")
+        state = dict(result["state"])
+        if result["interrupts"]:
+            state["__interrupt__"] = [Interrupt(value=i["value"], id=i["id"]) for i in result["interrupts"]]
+        return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run chat graph worker processes.")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1)))
+    parser.add_argument("--threads", type=int, default=THREADS_PER_WORKER, help="Jobs each worker runs at once.")
+    parser.add_argument("--db", default=GRAPH_DB)
+    args = parser.parse_args()
+
+    pool = GraphWorkerPool(args.workers, args.db, args.threads).start()
+    try:
+        while True:
+            time.sleep(60)
+            print(GraphJobQueue(args.db).stats())
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Drive concurrent simulated sessions through the real chat graph.
+
+Usage:
+    python -m writing_assistant.load_test --sessions 50 --concurrency 10 --revisions 2 --latency lognormal:400,0.4
+
+By default every LLM call goes to a local FakeChatModel. Pass --base-url to
+send them to an OpenAI-compatible stub server instead, and --graph-workers to
+run the graph on worker processes instead of in this process.
+"""
+import argparse
+import json
+import os
+import resource
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from langgraph.types import Command
+
+from .chat_graph import create_chat_graph, initialize_chat_state
+from .fake_chat_model import FakeChatModel, parse_latency
+from .feedback_classifier import classifier_stats
+from .models import set_chat_model_factory
+from .user_manager import UserManager
+
+REQUESTS = [
+    "Write a weekly status update email to my VP about the delayed launch. Keep it under 140 words.",
+    "Draft a LinkedIn post announcing our new mobile app; sound humble; include 3 hashtags.",
+    "Email a customer about a delayed shipment and give them two options.",
+    "Write a short internal note explaining yesterday's outage and next steps.",
+]
+
+FEEDBACK = [
+    "Make it more formal and add a subject line.",
+    "Shorter please, and use bullet points for the key changes.",
+    "Lead with the outcome and remove the exclamation marks.",
+    "Fix the typo in the second sentence.",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def make_memories(count: int) -> List[str]:
+    """Synthetic memories so selection prompts have a realistic size."""
+    topics = ["executive updates", "social posts", "customer emails", "internal notes", "blog posts"]
+    return [
+        f"For {topics[i % len(topics)]}, prefers a concise, direct style with a clear call to action (rule {i + 1})."
+        for i in range(count)
+    ]
+
+
+def run_session(graph, index: int, revisions: int, user: str, memory_ids: List[str]) -> Dict[str, Any]:
+    """Run one session: draft, revise `revisions` times, approve and confirm memories."""
+    config = {"configurable": {"thread_id": f"load-{index}-{uuid.uuid4().hex[:8]}"}}
+    state = initialize_chat_state()
+    state["user"] = user
+    state["memories"] = memory_ids
+    state["original_request"] = REQUESTS[index % len(REQUESTS)]
+
+    steps = []
+
+    def step(name, graph_input):
+        started = time.perf_counter()
+        result = graph.invoke(graph_input, config=config)
+        steps.append((name, time.perf_counter() - started))
+        return result
+
+    started = time.perf_counter()
+    step("draft", state)
+    for round_number in range(revisions):
+        step("revise", Command(resume={"action": "revise", "feedback": FEEDBACK[(index + round_number) % len(FEEDBACK)]}))
+    result = step("approve", Command(resume={"action": "approve", "feedback": ""}))
+    if result.get("__interrupt__"):
+        # Confirm none of the suggestions so every session sees the same memories
+        step("confirm", Command(resume={"action": "confirm_memories", "new_memories": []}))
+    return {"session": time.perf_counter() - started, "steps": steps}
+
+
+def configure_models(base_url: Optional[str], latency_spec: str, tool_responses_path: Optional[str]):
+    """Point every LLM call at the stub server or the fake model. Also runs in each graph worker."""
+    if base_url:
+        from langchain_openai import ChatOpenAI
+        set_chat_model_factory(lambda model, **kwargs: ChatOpenAI(model=model, base_url=base_url, api_key="stub", **kwargs))
+        return
+    latency = parse_latency(latency_spec)
+    tool_responses = {}
+    if tool_responses_path:
+        with open(tool_responses_path) as f:
+            tool_responses = json.load(f)
+    set_chat_model_factory(lambda model, **kwargs: FakeChatModel(model_name=model, latency=latency, tool_responses=tool_responses))
+
+
+def run_load_test(sessions: int, concurrency: int, revisions: int, memory_count: int, graph=None) -> Dict[str, Any]:
+    """Run `sessions` sessions with at most `concurrency` in flight and summarize the results.
+
+    The synthetic memories are saved for a new user in the users file, as the graph resolves memory IDs there.
+    """
+    graph = graph or create_chat_graph()
+    user_manager = UserManager()
+    user = f"load-test-{uuid.uuid4().hex[:8]}"
+    user_manager.add_memories(user, make_memories(memory_count))
+    memory_ids = user_manager.get_memory_ids(user)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    results, errors = [], []
+    lock = threading.Lock()
+
+    def worker(index):
+        try:
+            outcome = run_session(graph, index, revisions, user, memory_ids)
+            with lock:
+                results.append(outcome)
+        except Exception as e:
+            with lock:
+                errors.append(repr(e))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(sessions)))
+    elapsed = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def summary(values):
+        return {
+            "count": len(values),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+
+    step_names = sorted({name for outcome in results for name, _ in outcome["steps"]})
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "elapsed_s": elapsed,
+        "sessions_per_s": len(results) / elapsed if elapsed else 0.0,
+        "steps_per_s": sum(len(outcome["steps"]) for outcome in results) / elapsed if elapsed else 0.0,
+        "session_latency": summary([outcome["session"] for outcome in results]),
+        "step_latency": {
+            name: summary([seconds for outcome in results for step_name, seconds in outcome["steps"] if step_name == name])
+            for name in step_names
+        },
+        # ru_maxrss is reported in kilobytes on Linux
+        "max_rss_mb_before": rss_before / 1024,
+        "max_rss_mb_after": rss_after / 1024,
+        "max_rss_growth_mb": (rss_after - rss_before) / 1024,
+        # Counted in this process only, so empty when the graph runs on worker processes
+        "feedback_classifier": classifier_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the chat graph with simulated sessions.")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--revisions", type=int, default=2)
+    parser.add_argument("--memories", type=int, default=20, help="Synthetic memories per session.")
+    parser.add_argument("--latency", default="lognormal:300,0.5",
+                        help="fixed:MS, uniform:LO,HI, lognormal:MEDIAN,SIGMA or exp:MEAN (milliseconds).")
+    parser.add_argument("--tool-responses", help="JSON file mapping tool names to fixed tool-call arguments.")
+    parser.add_argument("--base-url", help="Send requests to an OpenAI-compatible server instead of the fake model.")
+    parser.add_argument("--graph-workers", type=int, default=0,
+                        help="Run the graph on this many worker processes with a SQLite checkpointer.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    # Keep the synthetic users and their token usage out of the real files; graph workers inherit the settings
+    data_dir = tempfile.mkdtemp()
+    os.environ["WRITING_ASSISTANT_USERS_FILE"] = os.path.join(data_dir, "users.json")
+    os.environ["WRITING_ASSISTANT_USAGE_DB"] = os.path.join(data_dir, "usage.db")
+    model_args = (args.base_url, args.latency, args.tool_responses)
+    configure_models(*model_args)
+    if args.graph_workers:
+        # Only needed (with its SQLite checkpointer dependency) when running on graph workers
+        from .graph_worker import GraphClient, GraphJobQueue, GraphWorkerPool
+
+        path = os.path.join(tempfile.mkdtemp(), "graph.db")
+        pool = GraphWorkerPool(args.graph_workers, path, initializer=configure_models, initargs=model_args).start()
+        try:
+            report = run_load_test(args.sessions, args.concurrency, args.revisions, args.memories,
+                                   graph=GraphClient(GraphJobQueue(path)))
+        finally:
+            pool.stop()
+    else:
+        report = run_load_test(args.sessions, args.concurrency, args.revisions, args.memories)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['sessions']} sessions, concurrency {report['concurrency']}, {report['errors']} errors, {report['elapsed_s']:.2f}s")
+    print(f"Throughput: {report['sessions_per_s']:.2f} sessions/s, {report['steps_per_s']:.2f} steps/s")
+    rows = [("session", report["session_latency"])] + list(report["step_latency"].items())
+    print(f"{'':<10}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in rows:
+        print(f"{name:<10}{stats['count']:>8}{stats['p50_ms']:>10.0f}{stats['p95_ms']:>10.0f}{stats['p99_ms']:>10.0f}")
+    print(f"Max RSS: {report['max_rss_mb_before']:.1f} MB -> {report['max_rss_mb_after']:.1f} MB (+{report['max_rss_growth_mb']:.1f} MB)")
+    classifier = report["feedback_classifier"]
+    if classifier.get("checked"):
+        print(f"Memory extraction skipped for {classifier['skip_rate']:.0%} of sessions; "
+              f"{classifier['hit_rate']:.0%} of extractions found memories")
+    for error in report["error_samples"]:
+        print(f"Error: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from pydantic import BaseModel, Field
+
+from .chat_state import ChatState
+from .event_log import log_event
+from .deadlines import DeadlineExceeded, deadline_for, record_fallback
+from .model_router import invoke_routed
+from .revision_store import append_revision
+from .nodes.memory_selector_node import memories_by_id
+
+SECTION_CONCURRENCY = int(os.getenv("WRITING_ASSISTANT_SECTION_CONCURRENCY", "6"))
+
+
+class OutlineSection(BaseModel):
+    """A single section of a long document outline"""
+    title: str = Field(description="Short heading for the section.")
+    brief: str = Field(description="One or two sentences describing what the section covers.")
+
+
+class DocumentOutline(BaseModel):
+    """Structured output for a long document outline"""
+    sections: List[OutlineSection] = Field(
+        description="Ordered list of sections that together satisfy the request. Typically 3-8 sections."
+    )
+
+
+class SectionTargets(BaseModel):
+    """Structured output for deciding which sections feedback applies to"""
+    section_numbers: List[int] = Field(
+        description="1-based numbers of the sections that must change to address the feedback. Include every section if the feedback applies to the whole document."
+    )
+
+
+OUTLINE_PROMPT = """
+You are ContextCraft, planning a long document. Produce an outline that directly satisfies the Original Request. You are tool-bound; respond with a DocumentOutline tool call.
+
+- Order sections the way the final document should read.
+- Give each section a short heading and a one or two sentence brief.
+- Do not add sections the request does not call for.
+
+User Preferences (may be empty):
+{user_preferences}
+
+**Original Request:**
+
+{original_request}
+"""
+
+SECTION_TEMPLATE = """
+You are ContextCraft, writing one section of a longer document. Other sections are written separately, so cover only your section and do not repeat material that belongs elsewhere in the outline.
+
+- Follow the Original Request and apply relevant User Preferences.
+- Do not mention or reference having "memories," "preferences," or any meta-instructions.
+- Output only the body of the section (no heading, no preamble, no notes).
+
+User Preferences (may be empty):
+{user_preferences}
+
+**Original Request:**
+
+{original_request}
+
+**Full Outline:**
+
+{outline}
+
+**Your Section:** {number}. {title}: {brief}
+"""
+
+TARGET_PROMPT = """
+You are ContextCraft, routing revision feedback on a long document. Decide which sections must change to address the feedback. You are tool-bound; respond with a SectionTargets tool call.
+
+**Sections:**
+
+{sections}
+
+**User Feedback:**
+
+{feedback}
+"""
+
+REVISE_SECTION_TEMPLATE = """
+You are ContextCraft, revising one section of a longer document based on user feedback. Implement the feedback precisely as it applies to this section, keep the good parts, and do not add new claims.
+
+User Preferences (may be empty):
+{user_preferences}
+
+**Original Request:**
+
+{original_request}
+
+**Full Outline:**
+
+{outline}
+
+**Your Section:** {number}. {title}
+
+**Current Section Text:**
+
+{text}
+
+Output only the revised body of the section (no heading, no commentary).
+"""
+
+
+def _format_preferences(state: ChatState) -> str:
+    memories = memories_by_id(state, state.get("applicable_memories") or [])
+    if not memories:
+        return ""
+    return "User Preferences:\n" + "\n".join([f"- {memory}" for memory in memories.values()]) + "\n"
+
+
+def _format_outline(sections: List[Dict[str, str]]) -> str:
+    return "\n".join([f"{i}. {section['title']}: {section['brief']}" for i, section in enumerate(sections, 1)])
+
+
+def stitch_sections(sections: List[Dict[str, str]]) -> str:
+    """Join drafted sections into a single document."""
+    return "\n\n".join([f"## {section['title']}\n\n{section['text'].strip()}" for section in sections])
+
+
+def _write_sections(config: RunnableConfig, message_lists: List[list], request_chars: int) -> List[str]:
+    """Run one routed section call per message list, at most SECTION_CONCURRENCY at a time.
+
+    Each call gets the router's escalation, deadline and timeout fallback. Sections that still
+    miss their deadline come back as None.
+    """
+    if not message_lists:
+        return []
+
+    def write(messages):
+        try:
+            return invoke_routed("section", config, messages, request_chars=request_chars, max_tokens=800).content
+        except DeadlineExceeded:
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(SECTION_CONCURRENCY, len(message_lists))) as pool:
+        return list(pool.map(write, message_lists))
+
+
+def draft_long_document(state: ChatState, config: RunnableConfig) -> ChatState:
+    """Outline the document, then draft every section concurrently."""
+    user_preferences = _format_preferences(state)
+
+    outline = invoke_routed("outline", config, OUTLINE_PROMPT.format(
+        user_preferences=user_preferences,
+        original_request=state["original_request"],
+    ), tools=[DocumentOutline], request_chars=len(state["original_request"]), max_tokens=600).tool_calls[0]["args"]["sections"]
+    log_event(config, f"Outlined long document with {len(outline)} sections.")
+
+    outline_text = _format_outline(outline)
+    batches = [
+        [
+            SystemMessage(content=SECTION_TEMPLATE.format(
+                user_preferences=user_preferences,
+                original_request=state["original_request"],
+                outline=outline_text,
+                number=i,
+                title=section["title"],
+                brief=section["brief"],
+            )),
+            HumanMessage(content=f"Write section {i}: {section['title']}"),
+        ]
+        for i, section in enumerate(outline, 1)
+    ]
+    texts = _write_sections(config, batches, len(state["original_request"]))
+    missing = [i for i, text in enumerate(texts, 1) if text is None]
+    if missing:
+        # Unlike a revision, there is no earlier text to fall back to
+        log_event(config, f"Sections {missing} missed their deadline.", sections=missing)
+        raise DeadlineExceeded("section", deadline_for("section"))
+
+    state["sections"] = [
+        {"title": section["title"], "brief": section["brief"], "text": text}
+        for section, text in zip(outline, texts)
+    ]
+    state["current_draft"] = stitch_sections(state["sections"])
+    return state
+
+
+def revise_long_document(state: ChatState, config: RunnableConfig) -> ChatState:
+    """Regenerate only the sections targeted by the feedback, in parallel."""
+    sections = state["sections"]
+    section_list = "\n".join([
+        f"{i}. {section['title']}: {section['text'][:200]}" for i, section in enumerate(sections, 1)
+    ])
+    numbers = invoke_routed("section_target", config, TARGET_PROMPT.format(
+        sections=section_list,
+        feedback=state["feedback"],
+    ), tools=[SectionTargets], max_tokens=100).tool_calls[0]["args"]["section_numbers"]
+    targets = sorted({n for n in numbers if 1 <= n <= len(sections)}) or list(range(1, len(sections) + 1))
+    log_event(config, f"Revising {len(targets)} of {len(sections)} sections.", sections=targets)
+
+    user_preferences = _format_preferences(state)
+    outline_text = _format_outline(sections)
+    batches = [
+        [
+            SystemMessage(content=REVISE_SECTION_TEMPLATE.format(
+                user_preferences=user_preferences,
+                original_request=state["original_request"],
+                outline=outline_text,
+                number=n,
+                title=sections[n - 1]["title"],
+                text=sections[n - 1]["text"],
+            )),
+            HumanMessage(content=state["feedback"]),
+        ]
+        for n in targets
+    ]
+    texts = _write_sections(config, batches, len(state["feedback"]))
+
+    revised = [dict(section) for section in sections]
+    for n, text in zip(targets, texts):
+        if text is None:
+            # Keep the section as it was rather than failing the whole revision
+            record_fallback(config, "section", f"unrevised section {n}")
+            continue
+        revised[n - 1]["text"] = text
+
+    append_revision(state["past_revisions"], state["current_draft"], state["feedback"])
+    state["sections"] = revised
+    state["current_draft"] = stitch_sections(revised)
+    return state
@@ -0,0 +1,31 @@
+import re
+from typing import Dict, List, Set, Tuple
+
+# Words that carry no topic on their own in requests, feedback or memories
+STOPWORDS = {
+    "a", "about", "add", "all", "also", "always", "an", "and", "any", "are", "as", "at", "be", "but", "by",
+    "can", "change", "could", "do", "does", "don't", "draft", "for", "from", "get", "has", "have", "i",
+    "in", "instead", "into", "is", "it", "its", "just", "keep", "less", "like", "make", "me", "more",
+    "my", "no", "not", "of", "on", "or", "our", "please", "prefer", "prefers", "should", "so", "some",
+    "than", "that", "the", "their", "them", "then", "there", "this", "to", "too", "use", "using", "very",
+    "want", "we", "when", "with", "would", "write", "you", "your",
+}
+
+
+def content_words(text: str) -> Set[str]:
+    """Lowercase content words with a crude plural strip, for cheap topic overlap checks."""
+    words = set()
+    for word in re.findall(r"[a-z][a-z'-]+", text.lower()):
+        if word in STOPWORDS or len(word) < 3:
+            continue
+        if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.add(word)
+    return words
+
+
+def rank_by_overlap(text: str, memories: Dict[str, str]) -> List[Tuple[int, str]]:
+    """Return (shared word count, memory ID) for memories (ID -> text) sharing content words with `text`, best first."""
+    words = content_words(text)
+    scored = [(len(words & content_words(memory)), memory_id) for memory_id, memory in memories.items()]
+    return sorted([pair for pair in scored if pair[0] > 0], key=lambda pair: -pair[0])
@@ -0,0 +1,62 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List
+
+
+class MicroBatcher:
+    """Group calls arriving close together into one batched call and hand each caller its own result.
+
+    After the first call arrives, more are collected until none arrives for `window` seconds,
+    `max_wait` seconds have passed, or `max_batch` calls are waiting. A lone call therefore
+    waits at most `window` seconds longer than it would unbatched.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]], window: float, max_wait: float,
+                 max_batch: int, name: str = "micro-batch"):
+        self.run_batch = run_batch
+        self.window = window
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix=name)
+        self._dispatcher = threading.Thread(target=self._dispatch, name=f"{name}-dispatcher", daemon=True)
+        self._start_lock = threading.Lock()
+
+    def submit(self, item: Any) -> Any:
+        """Queue `item` for the next batch and block until its result (or exception) is ready."""
+        with self._start_lock:
+            if not self._dispatcher.is_alive():
+                self._dispatcher.start()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = min(self.window, deadline - time.monotonic())
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch(self):
+        while True:
+            # Run batches on the executor so the next one can be collected meanwhile
+            self._executor.submit(self._run, self._collect())
+
+    def _run(self, batch: List[tuple]):
+        try:
+            results = self.run_batch([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
@@ -0,0 +1,133 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+
+from .budgets import check_budget, config_user, record_usage
+from .deadlines import DeadlineExceeded, call_with_deadline, deadline_for, record_fallback
+from .event_log import log_event
+from .models import chat_model
+
+# Per task: a model ladder ordered fast -> strong, the limits under which a
+# call counts as simple enough for the first (fast) model, and optionally a
+# faster model to retry on when a call misses its deadline.
+DEFAULT_ROUTES: Dict[str, Dict[str, Any]] = {
+    "draft": {"models": ["gpt-4.1-mini", "gpt-4.1"], "fast_max_chars": 300, "fast_max_memories": 3,
+              "timeout_fallback": "gpt-4.1-nano"},
+    "revise": {"models": ["gpt-3.5-turbo", "gpt-4.1"], "fast_max_chars": 6000, "fast_max_memories": 20,
+               "timeout_fallback": "gpt-4.1-nano"},
+    "select": {"models": ["gpt-4o-mini", "gpt-4.1"], "fast_max_chars": 2000, "fast_max_memories": 50},
+    "extract": {"models": ["gpt-4o-mini", "gpt-4.1"], "fast_max_chars": 20000, "fast_max_memories": 100},
+    "outline": {"models": ["gpt-4o-mini", "gpt-4.1"], "fast_max_chars": 2000, "fast_max_memories": 20},
+    "section_target": {"models": ["gpt-4o-mini", "gpt-4.1"], "fast_max_chars": 4000, "fast_max_memories": 100},
+    "section": {"models": ["gpt-4.1"], "fast_max_chars": 0, "fast_max_memories": 0,
+                "timeout_fallback": "gpt-4.1-mini"},
+}
+
+
+def _load_routes() -> Dict[str, Dict[str, Any]]:
+    """Default routes, overridden per task by WRITING_ASSISTANT_MODEL_ROUTES (JSON text or a JSON file path)."""
+    routes = {task: dict(route) for task, route in DEFAULT_ROUTES.items()}
+    override = os.getenv("WRITING_ASSISTANT_MODEL_ROUTES")
+    if override:
+        if os.path.exists(override):
+            with open(override) as f:
+                override = f.read()
+        for task, route in json.loads(override).items():
+            routes.setdefault(task, {}).update(route)
+    return routes
+
+
+ROUTES = _load_routes()
+
+
+def _input_chars(model_input) -> int:
+    if isinstance(model_input, str):
+        return len(model_input)
+    return sum(len(str(message.content)) for message in model_input)
+
+
+def route_model(task: str, request_chars: int, memory_count: int = 0, downgrade: bool = False) -> Tuple[List[str], str]:
+    """Pick the escalation ladder for a call: returns (models to try in order, reason)."""
+    route = ROUTES[task]
+    models = route["models"]
+    if downgrade:
+        # Over the soft token budget: always start on the cheapest model
+        return models, "over soft token budget"
+    if request_chars <= route["fast_max_chars"] and memory_count <= route["fast_max_memories"]:
+        return models, "simple request"
+    # Not simple: skip the fast model if the ladder has a stronger one
+    return (models[1:] or models), "long request or many memories"
+
+
+def _check_tool_call(response, tools) -> Optional[str]:
+    """Return why a structured response is malformed, or None if it is usable."""
+    if not response.tool_calls:
+        return "missing tool call"
+    call = response.tool_calls[0]
+    expected = tools[0]
+    if call["name"] != expected.__name__:
+        return f"unexpected tool {call['name']}"
+    try:
+        expected.model_validate(call["args"])
+    except Exception as e:
+        return f"invalid arguments: {e}"
+    return None
+
+
+def invoke_routed(task: str, config: RunnableConfig, model_input, *, tools: Optional[list] = None,
+                  request_chars: Optional[int] = None, memory_count: int = 0,
+                  deadline: Optional[float] = None, bill_to: Optional[List[str]] = None, **model_kwargs):
+    """Invoke the routed model, escalating up the ladder on errors or malformed tool calls.
+
+    Each attempt must finish within the task's deadline (or `deadline` seconds, 0 for none).
+    A missed deadline retries once on the task's timeout_fallback model if it has one,
+    and otherwise raises DeadlineExceeded.
+
+    Tokens are billed to the config's user, or split between `bill_to` for batched calls.
+    A user over the soft budget starts on the cheapest model; one over the hard budget gets BudgetExceeded.
+    """
+    if request_chars is None:
+        request_chars = _input_chars(model_input)
+    downgrade = check_budget(config, task) == "soft"
+    models, reason = route_model(task, request_chars, memory_count, downgrade)
+    users = bill_to if bill_to is not None else [config_user(config)]
+    seconds = deadline_for(task) if deadline is None else (deadline or None)
+    if seconds:
+        model_kwargs.setdefault("timeout", seconds)
+
+    queue = list(models)
+    last_error = None
+    attempt = 0
+    while queue:
+        model = queue.pop(0)
+        log_event(config, f"Routed {task} to {model}.", task=task, model=model,
+                  reason=reason if attempt == 0 else f"retry after: {last_error}",
+                  request_chars=request_chars, memory_count=memory_count)
+        attempt += 1
+        llm = chat_model(model, **model_kwargs)
+        if tools:
+            llm = llm.bind_tools(tools)
+        try:
+            response = call_with_deadline(task, seconds, llm.invoke, model_input)
+        except DeadlineExceeded as e:
+            fallback = ROUTES[task].get("timeout_fallback")
+            if not fallback or model == fallback:
+                raise
+            record_fallback(config, task, fallback)
+            last_error = str(e)
+            queue = [fallback]
+            continue
+        except Exception as e:
+            last_error = f"{type(e).__name__}: {e}"
+            continue
+
+        # Malformed responses still used tokens
+        record_usage(users, task, [response])
+        problem = _check_tool_call(response, tools) if tools else (None if response.content else "empty response")
+        if problem is None:
+            return response
+        last_error = problem
+
+    raise RuntimeError(f"All models failed for {task}: {last_error}")
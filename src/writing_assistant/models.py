@@ -0,0 +1,21 @@
+from typing import Callable, Optional
+
+from langchain_openai import ChatOpenAI
+
+_chat_model_factory: Optional[Callable] = None
+
+
+def set_chat_model_factory(factory: Optional[Callable]):
+    """Override how nodes create chat models (e.g. with a fake model for load tests).
+
+    The factory is called as factory(model, **kwargs). Pass None to restore ChatOpenAI.
+    """
+    global _chat_model_factory
+    _chat_model_factory = factory
+
+
+def chat_model(model: str, **kwargs):
+    """Create the chat model used by the nodes."""
+    if _chat_model_factory is not None:
+        return _chat_model_factory(model, **kwargs)
+    return ChatOpenAI(model=model, **kwargs)
@@ -1,14 +1,16 @@
 from ..chat_state import ChatState
 from ..user_manager import UserManager
+from ..event_log import log_event
+from langchain_core.runnables import RunnableConfig
 from langgraph.types import Command, interrupt
 from langgraph.graph import END
 
-def confirm_memories_node(state: ChatState) -> Command:
+def confirm_memories_node(state: ChatState, config: RunnableConfig) -> Command:
     """
     Present suggested memories to the user for confirmation.
     This node interrupts the workflow to wait for user input.
     """
-    state["action_log"].append("Confirm memories node was invoked.")
+    log_event(config, "Confirm memories node was invoked.")
     
     # Format suggested memories for display
     memories_text = "\n".join([f"• {memory}" for memory in state["suggested_memories"]])
@@ -26,6 +28,6 @@ def confirm_memories_node(state: ChatState) -> Command:
         if state["user"] != "None Selected":
             UserManager().add_memories(state["user"], updated_memories)
         else:
-            state["action_log"].append("Skipped saving memories - no user selected.")
+            log_event(config, "Skipped saving memories - no user selected.")
 
     return Command(goto=END)
@@ -1,6 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+from ..budgets import budget_status, config_user
 from ..chat_state import ChatState
-from langchain_openai import ChatOpenAI
+from ..event_log import log_event
+from ..long_document import draft_long_document
+from ..model_router import invoke_routed
+from .memory_selector_node import memories_by_id
 from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
 
 SYSTEM_TEMPLATE = """
 You are ContextCraft, a personalized, high-precision writing assistant. Your goal is to produce a strong first draft that:
@@ -69,22 +75,60 @@ We'll stay focused on delivering value for customers and building responsibly.
 #SeriesA #Startups #Teamwork
 """
 
-def draft_node(state: ChatState) -> ChatState:
+# (temperature, style hint) used for each extra candidate draft
+CANDIDATE_VARIANTS = [
+    (0.7, ""),
+    (1.0, "Take a noticeably more concise angle than the obvious draft."),
+    (0.9, "Use a warmer, more conversational voice while meeting every constraint."),
+    (0.5, "Favor a more structured layout (short sections or bullets) where it fits the task."),
+]
+
+def draft_candidates(system_content: str, original_request: str, count: int, config: RunnableConfig, memory_count: int = 0) -> list:
+    """Generate several candidate drafts concurrently, one per variant."""
+    variants = CANDIDATE_VARIANTS[:count]
+
+    def generate(variant):
+        temperature, style_hint = variant
+        content = system_content + (f"\nStyle variant for this draft: {style_hint}\n" if style_hint else "")
+        messages = [SystemMessage(content=content), HumanMessage(content=original_request)]
+        return invoke_routed("draft", config, messages, request_chars=len(original_request),
+                             memory_count=memory_count, max_tokens=500, temperature=temperature).content
+
+    with ThreadPoolExecutor(max_workers=len(variants)) as pool:
+        return list(pool.map(generate, variants))
+
+def draft_node(state: ChatState, config: RunnableConfig) -> ChatState:
     """Node that creates the initial draft of the user input and generates AI response"""
-    state["action_log"].append("Draft node was invoked.")
+    log_event(config, "Draft node was invoked.")
+
+    if state.get("long_document"):
+        return draft_long_document(state, config)
     
     # Build user preferences from applicable memories
     user_preferences = ""
-    if state.get("applicable_memories") and len(state["applicable_memories"]) > 0:
-        user_preferences = "User Preferences:\n" + "\n".join([f"- {memory}" for memory in state["applicable_memories"]]) + "\n"
-    
-    # Get response from OpenAI using two messages
-    llm = ChatOpenAI(model="gpt-4.1", max_tokens=500)
+    applicable_memories = memories_by_id(state, state.get("applicable_memories") or [])
+    if applicable_memories:
+        user_preferences = "User Preferences:\n" + "\n".join([f"- {memory}" for memory in applicable_memories.values()]) + "\n"
     
+    # Optionally draft several candidates at once and let the user pick
+    num_candidates = min(state.get("num_candidates") or 1, len(CANDIDATE_VARIANTS))
+    if num_candidates > 1 and budget_status(config_user(config)) != "ok":
+        log_event(config, "Drafting a single candidate - over the soft token budget.")
+        num_candidates = 1
+    if num_candidates > 1:
+        candidates = draft_candidates(SYSTEM_TEMPLATE.format(user_preferences=user_preferences), state["original_request"], num_candidates,
+                                      config, memory_count=len(state.get("applicable_memories") or []))
+        log_event(config, f"Drafted {len(candidates)} candidate drafts.")
+        state["candidate_drafts"] = candidates
+        state["current_draft"] = candidates[0]
+        return state
+
+    # Get response from the routed model using two messages
     system_message = SystemMessage(content=SYSTEM_TEMPLATE.format(user_preferences=user_preferences))
     user_message = HumanMessage(content=state["original_request"])
     
-    response = llm.invoke([system_message, user_message])
+    response = invoke_routed("draft", config, [system_message, user_message], request_chars=len(state["original_request"]),
+                             memory_count=len(state.get("applicable_memories") or []), max_tokens=500)
     
     # Extract the response
     ai_response = response.content
@@ -2,16 +2,20 @@ from typing import Literal
 from langgraph.graph import END
 from langgraph.types import interrupt, Command
 from ..chat_state import ChatState
+from ..event_log import log_event
+from ..feedback_classifier import SKIP_TRIVIAL_FEEDBACK, classify_feedback, record_decision
+from langchain_core.runnables import RunnableConfig
 
 
-def human_approval(state: ChatState) -> Command[Literal[END, "revisor", "memory_extraction"]]:
+def human_approval(state: ChatState, config: RunnableConfig) -> Command[Literal[END, "revisor", "memory_extraction", "human_feedback"]]:
     """Node that handles human feedback on the draft"""
-    state["action_log"].append("Human feedback node was invoked.")
+    log_event(config, "Human feedback node was invoked.")
     user_choice = interrupt(
         {
             "question": "Is this correct?",
             "type": "draft",
             "llm_output": state["current_draft"],
+            "candidates": state.get("candidate_drafts", []),
         }
     )
 
@@ -19,14 +23,26 @@ def human_approval(state: ChatState) -> Command[Literal[END, "revisor", "memory_
     feedback = user_choice.get("feedback")
     
     if action == "approve" and len(state["past_revisions"]) > 0:
-        state["action_log"].append("User approved the draft after revisions.")
-        return Command(goto="memory_extraction", update={"action_log": state["action_log"]})
+        log_event(config, "User approved the draft after revisions.")
+        if SKIP_TRIVIAL_FEEDBACK:
+            # Typo fixes and date corrections teach nothing; don't spend an extraction call on them
+            has_signal, reason = classify_feedback([revision["feedback"] for revision in state["past_revisions"]])
+            record_decision(has_signal)
+            if not has_signal:
+                log_event(config, "Skipping memory extraction - feedback has no stylistic signal.", reason=reason)
+                return Command(goto=END)
+            log_event(config, "Feedback has stylistic signal.", reason=reason)
+        return Command(goto="memory_extraction")
     elif action == "approve":
-        state["action_log"].append("User approved the draft.")
+        log_event(config, "User approved the draft.")
         return Command(goto=END)
+    elif action == "pick":
+        index = user_choice.get("index", 0)
+        log_event(config, f"User picked candidate draft #{index + 1}.")
+        return Command(goto="human_feedback", update={"current_draft": state["candidate_drafts"][index], "candidate_drafts": []})
     elif action == "revise":
-        state["action_log"].append(f"User requested a revision. Providing feedback: {feedback}")
-        return Command(goto="revisor", update={"feedback": feedback, "action_log": state["action_log"]})
+        log_event(config, "User requested a revision.", feedback=feedback)
+        return Command(goto="revisor", update={"feedback": feedback})
     elif action == "reject":
-        state["action_log"].append("User rejected the draft.")
+        log_event(config, "User rejected the draft.")
         return Command(goto=END)
@@ -1,7 +1,14 @@
 from ..chat_state import ChatState
-from langchain_openai import ChatOpenAI
+from ..event_log import log_event
+from ..revision_store import iter_revisions
+from ..model_router import invoke_routed
+from ..budgets import BudgetExceeded
+from ..deadlines import DeadlineExceeded, record_fallback
+from ..extraction_queue import DEFERRED_EXTRACTION, ExtractionQueue
+from ..feedback_classifier import record_extraction_result
+from langchain_core.runnables import RunnableConfig
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Any, Dict, List, Literal
 from langgraph.types import Command
 from langgraph.graph import END
 
@@ -11,14 +18,17 @@ class MemoryExtraction(BaseModel):
         description="List of new memory statements extracted from the revision cycle. Each memory should be a clear, actionable statement that includes contextual information about the interaction (formality level, communication style, focus areas, etc.). If no new meaningful insights emerge, this should be an empty list."
     )
 
-PROMPT = """
+# The prompt is split into sections so batched extraction (extraction_worker) can reuse them
+ROLE_SECTION = """
 # System role
 
 You are ContextCraft's Memory Miner. After a revision cycle, extract 0-3 new, actionable, context-rich memory statements about the user's preferences that will improve future drafts.
 
 The memories should be appropriately generalized. For example, if you get feedback on a thank you note written to a neighbor, the memory should be about "casual notes," not "notes to neighbors."
 
-# Quality bar for each memory
+"""
+
+QUALITY_BAR_SECTION = """# Quality bar for each memory
 
 Actionable: It should change how we write next time (tone, structure, format, emphasis, constraints).
 Contextual: Include the situation where it applies (e.g., for executive emails, for customer responses, for social posts).
@@ -27,7 +37,9 @@ Concise: 1 sentence each, crystal clear.
 Non-duplicative: Don't restate generic best practices; capture the user's distinct preferences.
 Safety: Avoid committing to risky claims or promises as a “preference.”
 
-# Inputs
+"""
+
+INPUTS_SECTION = """# Inputs
 
 **Original Request:** {original_request}
 **Initial Draft:** {initial_draft}
@@ -35,7 +47,9 @@ Safety: Avoid committing to risky claims or promises as a “preference.”
 **Revised Draft:** {current_draft}
 **Past Revisions (optional):** {past_revisions}
 
-# What to capture (pick only what clearly emerges from this interaction)
+"""
+
+CAPTURE_SECTION = """# What to capture (pick only what clearly emerges from this interaction)
 
 Writing style preferences (tone, formality, length, structure, voice)
 Content preferences (what to emphasize or avoid)
@@ -43,12 +57,16 @@ Communication patterns (how they give feedback, what they value)
 Specific recurring requirements (e.g., include CTA, provide options, limit words)
 Contextual cues (audience, channel, urgency)
 
-# Output format
+"""
+
+OUTPUT_SECTION = """# Output format
 
 You are tool-bound. Return only the tool call for MemoryExtraction with a memories: List[str].
 If you found no solid new insight, return an empty list.
 
-# Few-shot examples (guidance)
+"""
+
+EXAMPLES_SECTION = """# Few-shot examples (guidance)
 
 ## Example 1 (customer email context)
 
@@ -82,19 +100,15 @@ If you found no solid new insight, return an empty list.
 If the revision only fixed typos or clarified a date with no stylistic or structural guidance, return: [].
 """
 
-def memory_extraction_node(state: ChatState) -> ChatState:
-    """Extract new memories from revision cycles to improve future writing"""
-    state["action_log"].append("Memory extraction node was invoked.")
-    
-    # If there are already suggested memories, skip extraction to preserve user modifications
-    if state.get("suggested_memories"):
-        state["action_log"].append("Skipping memory extraction - memories already exist.")
-        return Command(goto="confirm_memories")
-    
+PROMPT = ROLE_SECTION + QUALITY_BAR_SECTION + INPUTS_SECTION + CAPTURE_SECTION + OUTPUT_SECTION + EXAMPLES_SECTION
+
+
+def format_extraction_inputs(state: Dict[str, Any]) -> Dict[str, str]:
+    """Format the INPUTS_SECTION fields from a finished revision cycle"""
     # Format past revisions for context
     past_revisions_text = ""
     if state["past_revisions"]:
-        for i, revision in enumerate(state["past_revisions"], 1):
+        for i, revision in enumerate(iter_revisions(state["past_revisions"]), 1):
             past_revisions_text += f"Round {i}:\n"
             past_revisions_text += f"Feedback: {revision['feedback']}\n"
             past_revisions_text += f"Draft: {revision['draft']}\n\n"
@@ -104,19 +118,60 @@ def memory_extraction_node(state: ChatState) -> ChatState:
     if state["past_revisions"]:
         initial_draft = state["past_revisions"][0]["draft"]
     
-    prompt = PROMPT.format(
-        original_request=state["original_request"],
-        initial_draft=initial_draft,
-        feedback=state["feedback"],
-        current_draft=state["current_draft"],
-        past_revisions=past_revisions_text
-    )
+    return {
+        "original_request": state["original_request"],
+        "initial_draft": initial_draft,
+        "feedback": state["feedback"],
+        "current_draft": state["current_draft"],
+        "past_revisions": past_revisions_text,
+    }
+
+def build_extraction_prompt(state: ChatState) -> str:
+    """Format the extraction prompt from a finished revision cycle"""
+    return PROMPT.format(**format_extraction_inputs(state))
+
+def extract_memories(prompt: str, config: RunnableConfig, deadline=None) -> List[str]:
+    """Get memory statements from the routed model with structured output"""
+    response = invoke_routed("extract", config, prompt, tools=[MemoryExtraction], max_tokens=400, deadline=deadline)
+    return response.tool_calls[0]["args"]["memories"]
+
+def enqueue_extraction(state: ChatState, config: RunnableConfig) -> int:
+    """Queue the finished session for batched extraction; results are offered on the user's next visit"""
+    session = {key: state[key] for key in ("original_request", "past_revisions", "feedback", "current_draft")}
+    job_id = ExtractionQueue().enqueue(state["user"], session)
+    log_event(config, "Queued memory extraction for later.", job_id=job_id)
+    return job_id
+
+def memory_extraction_node(state: ChatState, config: RunnableConfig) -> Command[Literal["confirm_memories", END]]:
+    """Extract new memories from revision cycles to improve future writing"""
+    log_event(config, "Memory extraction node was invoked.")
     
-    # Get response from OpenAI with structured output
-    llm = ChatOpenAI(model="gpt-4o-mini", max_tokens=400)
-    llm_with_structure = llm.bind_tools([MemoryExtraction])
-    memories = llm_with_structure.invoke(prompt).tool_calls[0]["args"]["memories"]
-
+    # If there are already suggested memories, skip extraction to preserve user modifications
+    if state.get("suggested_memories"):
+        log_event(config, "Skipping memory extraction - memories already exist.")
+        return Command(goto="confirm_memories")
+    
+    has_user = state["user"] and state["user"] != "None Selected"
+    if DEFERRED_EXTRACTION and has_user:
+        enqueue_extraction(state, config)
+        return Command(goto=END)
+    
+    prompt = build_extraction_prompt(state)
+    try:
+        memories = extract_memories(prompt, config)
+    except DeadlineExceeded:
+        # Don't hold the user up; queue it if there is a user to save suggestions for
+        if has_user:
+            record_fallback(config, "extract", "deferred queue")
+            enqueue_extraction(state, config)
+        else:
+            record_fallback(config, "extract", "no memories")
+        return Command(goto=END)
+    except BudgetExceeded:
+        log_event(config, "Skipping memory extraction - daily token budget used up.")
+        return Command(goto=END)
+
+    record_extraction_result(len(memories) > 0)
     if len(memories) > 0:
         return Command(goto="confirm_memories", update={"suggested_memories": memories})
     else:
@@ -1,20 +1,37 @@
 from ..chat_state import ChatState
-from langchain_openai import ChatOpenAI
+from ..event_log import log_event
+from ..user_manager import UserManager
+from ..model_router import invoke_routed
+from ..deadlines import DeadlineExceeded, record_fallback
+from ..memory_matching import rank_by_overlap
+from ..micro_batching import MicroBatcher
+from ..budgets import budget_status, config_user
+from langchain_core.runnables import RunnableConfig
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Dict, List, Tuple
+import os
+
+# Selections from concurrent sessions can share one LLM call, and the rules and examples, when enabled
+BATCH_SELECTION = os.getenv("WRITING_ASSISTANT_BATCH_SELECTION", "").lower() in ("1", "true", "yes")
+BATCH_WINDOW = float(os.getenv("WRITING_ASSISTANT_SELECTION_BATCH_WINDOW_MS", "10")) / 1000
+BATCH_MAX_WAIT = float(os.getenv("WRITING_ASSISTANT_SELECTION_BATCH_MAX_WAIT_MS", "50")) / 1000
+BATCH_MAX_SIZE = int(os.getenv("WRITING_ASSISTANT_SELECTION_BATCH_SIZE", "8"))
 
 class MemorySelection(BaseModel):
     """Structured output for memory selection"""
-    applicable_memories: List[str] = Field(
-        description="List of memory statements that are applicable to the current request. Only include memories that are directly relevant to the user's current writing task."
+    applicable_memory_ids: List[str] = Field(
+        description="IDs of the memories that are applicable to the current request. Only include memories that are directly relevant to the user's current writing task."
     )
 
-PROMPT = """
+# The prompt is split into sections so batched selection can share the rules and examples
+ROLE_SECTION = """
 # System role
 
-You are ContextCrafts Memory Selector. Select only the memories that are directly relevant to this specific writing request. You are tool-bound; respond with a MemorySelection tool call.
+You are ContextCrafts Memory Selector. Select only the memories that are directly relevant to this specific writing request. Each memory is listed with its ID in brackets. You are tool-bound; respond with a MemorySelection tool call.
+
+"""
 
-# Decision rules (apply in order)
+RULES_SECTION = """# Decision rules (apply in order)
 
 - Identify the task type, audience, channel, and explicit constraints from the Current Request (e.g., email vs. social post, executive vs. customer, length limits, CTA, tone).
 - Prefer specific over general: if a task- or audience-specific memory applies, include it and omit redundant general memories.
@@ -24,25 +41,31 @@ You are ContextCrafts Memory Selector. Select only the memories that are directl
   3. If two applicable memories conflict and specificity is equal, choose the stricter/safer constraint (e.g., ≤150 words over “no limit”).
 - Channel and audience match: include memories that match the request's channel or audience; exclude mismatched ones (e.g., “for social posts” when the task is an email), unless a memory is clearly cross-cutting (“in all professional writing”).
 - Cross-cutting preferences (e.g., “avoid exclamation marks”) can be included when they do not contradict the request.
-- Maintain the original wording of selected memories exactly.
+- Refer to selected memories by their ID exactly as given; never repeat their text.
 - Select the minimal set that will materially guide the draft (typically 2-6). If none are applicable, return an empty list.
 
-# Inputs
+"""
+
+INPUTS_SECTION = """# Inputs
 
 **Current Request:**
 
 {original_request}
 
-**Available Memories (one per line):**
+**Available Memories (one per line, ID first):**
 
 {available_memories}
 
-# Output
+"""
+
+OUTPUT_SECTION = """# Output
 
-Return a tool call to MemorySelection with applicable_memories: List[str] containing only the applicable memories with their original wording.
+Return a tool call to MemorySelection with applicable_memory_ids: List[str] containing only the IDs of the applicable memories.
 If none are applicable, return an empty list.
 
-# Examples
+"""
+
+EXAMPLES_SECTION = """# Examples
 
 ## Example 1
 
@@ -52,19 +75,15 @@ If none are applicable, return an empty list.
 
 **Available Memories:**
 
-- For executive updates, prefers semi-formal tone that leads with the outcome, followed by ≤3 bullets, ≤150 words, and no exclamation marks.
-- For social posts, upbeat but humble, 1-2 short paragraphs, no emojis.
-- Include a direct CTA at the end when requesting alignment from leadership.
-- Use British English spelling.
-- For product release notes, use version header and Highlights/Changes/Fixes sections.
+- [m1] For executive updates, prefers semi-formal tone that leads with the outcome, followed by ≤3 bullets, ≤150 words, and no exclamation marks.
+- [m2] For social posts, upbeat but humble, 1-2 short paragraphs, no emojis.
+- [m3] Include a direct CTA at the end when requesting alignment from leadership.
+- [m4] Use British English spelling.
+- [m5] For product release notes, use version header and Highlights/Changes/Fixes sections.
 
-**Selected applicable_memories:**
+**Selected applicable_memory_ids:**
 
-[
-"For executive updates, prefers semi-formal tone that leads with the outcome, followed by ≤3 bullets, ≤150 words, and no exclamation marks.",
-"Include a direct CTA at the end when requesting alignment from leadership.",
-"Use British English spelling."
-]
+["m1", "m3", "m4"]
 
 ## Example 2
 
@@ -74,17 +93,14 @@ If none are applicable, return an empty list.
 
 **Available Memories:**
 
-- For customer support emails, be empathetic, avoid blame, provide 2 options and a clear CTA.
-- For social posts, upbeat but humble, 1-2 short paragraphs, no emojis.
-- Use “we” not “I” in public announcements.
-- For executive updates, ≤3 bullets and ≤150 words.
+- [m6] For customer support emails, be empathetic, avoid blame, provide 2 options and a clear CTA.
+- [m2] For social posts, upbeat but humble, 1-2 short paragraphs, no emojis.
+- [m7] Use “we” not “I” in public announcements.
+- [m8] For executive updates, ≤3 bullets and ≤150 words.
 
-**Selected applicable_memories:**
+**Selected applicable_memory_ids:**
 
-[
-"For social posts, upbeat but humble, 1-2 short paragraphs, no emojis.",
-"Use “we” not “I” in public announcements."
-]
+["m2", "m7"]
 
 ## Example 3
 
@@ -94,15 +110,13 @@ If none are applicable, return an empty list.
 
 **Available Memories:**
 
-- For sales emails, keep it friendly and short with a single CTA.
-- Avoid exclamation marks in all professional writing.
-- For internal notes, concise, factual, no blame; end with next steps.
+- [m9] For sales emails, keep it friendly and short with a single CTA.
+- [m10] Avoid exclamation marks in all professional writing.
+- [m11] For internal notes, concise, factual, no blame; end with next steps.
 
-**Selected applicable_memories:**
+**Selected applicable_memory_ids:**
 
-[
-"Avoid exclamation marks in all professional writing."
-]
+["m10"]
 
 ## Example 4 (no applicable memories)
 
@@ -112,40 +126,134 @@ If none are applicable, return an empty list.
 
 **Available Memories:**
 
-- For executive updates, semi-formal, lead with outcome.
-- For customer emails, include two options and a CTA.
+- [m12] For executive updates, semi-formal, lead with outcome.
+- [m13] For customer emails, include two options and a CTA.
 
-**Selected applicable_memories:**
+**Selected applicable_memory_ids:**
 
 []
 """
 
-def memory_selector_node(state: ChatState) -> ChatState:
+PROMPT = ROLE_SECTION + RULES_SECTION + INPUTS_SECTION + OUTPUT_SECTION + EXAMPLES_SECTION
+
+class RequestSelection(BaseModel):
+    """Applicable memories for one request of a batch"""
+    request: int = Field(description="The request number as given in the input.")
+    applicable_memory_ids: List[str] = Field(description="IDs of the memories applicable to this request. Empty if none apply.")
+
+class BatchMemorySelection(BaseModel):
+    """Structured output for selecting memories for several requests at once"""
+    selections: List[RequestSelection] = Field(description="One entry per input request, in any order.")
+
+BATCH_ROLE_SECTION = """
+# System role
+
+You are ContextCrafts Memory Selector. Below are several independent writing requests, each with its own list of available memories. For each request separately, select only the memories from its own list that are directly relevant to it. Each memory is listed with its ID in brackets. You are tool-bound; respond with a BatchMemorySelection tool call.
+
+"""
+
+BATCH_OUTPUT_SECTION = """# Output
+
+Return a tool call to BatchMemorySelection with one entry per request: its request number and applicable_memory_ids: List[str] containing only IDs from that request's own list.
+If none are applicable to a request, return an empty list for it.
+
+"""
+
+BATCH_PROMPT = BATCH_ROLE_SECTION + RULES_SECTION + BATCH_OUTPUT_SECTION + EXAMPLES_SECTION + """
+# Requests
+
+{requests}
+"""
+
+# Most memories the local heuristic picks when the selector misses its deadline
+HEURISTIC_LIMIT = 5
+
+def format_available_memories(memories: Dict[str, str]) -> str:
+    return "\n".join([f"- [{memory_id}] {memory}" for memory_id, memory in memories.items()])
+
+def _select_one(request: str, memories: Dict[str, str], config: RunnableConfig) -> List[str]:
+    prompt = PROMPT.format(
+        original_request=request,
+        available_memories=format_available_memories(memories)
+    )
+    
+    # Get response from the routed model with structured output
+    result = invoke_routed("select", config, prompt, tools=[MemorySelection], request_chars=len(request),
+                           memory_count=len(memories), max_tokens=300)
+    
+    # Extract applicable memory IDs, dropping any the model made up
+    return [memory_id for memory_id in result.tool_calls[0]["args"]["applicable_memory_ids"] if memory_id in memories]
+
+def _select_batch(items: List[Tuple[str, Dict[str, str], RunnableConfig]]) -> List[List[str]]:
+    """Select memories for several (request, memories, config) items with one LLM call"""
+    if len(items) == 1:
+        return [_select_one(*items[0])]
+    
+    requests_text = "\n".join([
+        f"## Request {number}\n\n" + INPUTS_SECTION.format(original_request=request, available_memories=format_available_memories(memories))
+        for number, (request, memories, _) in enumerate(items, 1)
+    ])
+    # Routing, escalation and fallback events of the shared call go to every member's thread
+    thread_ids = [config.get("configurable", {}).get("thread_id", "default") for _, _, config in items]
+    batch_config = {"configurable": {"thread_ids": thread_ids}}
+    # Route on the largest item rather than the total so batching doesn't escalate to the strong model
+    result = invoke_routed("select", batch_config, BATCH_PROMPT.format(requests=requests_text), tools=[BatchMemorySelection],
+                           request_chars=max(len(request) for request, _, _ in items),
+                           memory_count=max(len(memories) for _, memories, _ in items), max_tokens=150 * len(items),
+                           bill_to=[config_user(config) for _, _, config in items])
+    
+    selected = [[] for _ in items]
+    for entry in result.tool_calls[0]["args"]["selections"]:
+        if 1 <= entry["request"] <= len(items):
+            memories = items[entry["request"] - 1][1]
+            selected[entry["request"] - 1] = [memory_id for memory_id in entry["applicable_memory_ids"] if memory_id in memories]
+    for _, _, config in items:
+        log_event(config, f"Selected memories in a batch of {len(items)} requests.")
+    return selected
+
+_batcher = MicroBatcher(_select_batch, BATCH_WINDOW, BATCH_MAX_WAIT, BATCH_MAX_SIZE, name="memory-selection") if BATCH_SELECTION else None
+
+def select_memories(request: str, memories: Dict[str, str], config: RunnableConfig) -> List[str]:
+    """Ask the model which of `memories` (ID -> text) apply to `request`. Returns memory IDs."""
+    if _batcher:
+        return _batcher.submit((request, memories, config))
+    return _select_one(request, memories, config)
+
+def memories_by_id(state: ChatState, memory_ids: List[str]) -> Dict[str, str]:
+    """Resolve memory IDs from state to their text through the shared per-user cache"""
+    index = UserManager().get_memory_index(state["user"]) if memory_ids else {}
+    return {memory_id: index[memory_id] for memory_id in memory_ids if memory_id in index}
+
+def record_selection(state: ChatState, memory_ids: List[str]):
+    """Track which memories actually get used so cold ones can be archived"""
+    if memory_ids and state["user"] and state["user"] != "None Selected":
+        user_manager = UserManager()
+        user_manager.record_memory_usage(state["user"], user_manager.resolve_memories(state["user"], memory_ids))
+
+def memory_selector_node(state: ChatState, config: RunnableConfig) -> ChatState:
     """Select which memories are applicable to the current request"""
-    state["action_log"].append("Memory selector node was invoked.")
+    log_event(config, "Memory selector node was invoked.")
     
     # If no memories exist, return empty list
     if not state.get("memories") or len(state["memories"]) == 0:
         state["applicable_memories"] = []
         return state
     
-    # Format available memories
-    available_memories = "\n".join([f"- {memory}" for memory in state["memories"]])
-    
-    prompt = PROMPT.format(
-        original_request=state["original_request"],
-        available_memories=available_memories
-    )
-    
-    # Get response from OpenAI with structured output
-    llm = ChatOpenAI(model="gpt-4o-mini", max_tokens=300)
-    llm_with_structure = llm.bind_tools([MemorySelection])
-    result = llm_with_structure.invoke(prompt)
-    
-    # Extract applicable memories
-    applicable_memories = result.tool_calls[0]["args"]["applicable_memories"]
+    memories = memories_by_id(state, state["memories"])
+    if budget_status(config_user(config)) != "ok":
+        # Over the soft token budget: skip the selection prompt and pick memories locally
+        applicable_memories = [memory_id for _, memory_id in rank_by_overlap(state["original_request"], memories)[:HEURISTIC_LIMIT]]
+        log_event(config, "Selected memories locally to save tokens.")
+    else:
+        try:
+            applicable_memories = select_memories(state["original_request"], memories, config)
+        except DeadlineExceeded:
+            # Fall back to the memories sharing the most words with the request (possibly none)
+            applicable_memories = [memory_id for _, memory_id in rank_by_overlap(state["original_request"], memories)[:HEURISTIC_LIMIT]]
+            record_fallback(config, "select", "local heuristic")
     
     # Update state
     state["applicable_memories"] = applicable_memories
+    record_selection(state, applicable_memories)
     
     return state
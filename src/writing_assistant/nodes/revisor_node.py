@@ -1,6 +1,13 @@
 from ..chat_state import ChatState
-from langchain_openai import ChatOpenAI
+from ..event_log import log_event
+from ..revision_store import append_revision, iter_revisions
+from ..long_document import revise_long_document
+from ..memory_matching import rank_by_overlap
+from .memory_selector_node import memories_by_id, select_memories, record_selection
+from ..deadlines import DeadlineExceeded, record_fallback
+from ..model_router import invoke_routed
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langchain_core.runnables import RunnableConfig
 
 SYSTEM_TEMPLATE = """
 You are ContextCraft, revising a draft based on user feedback. Your goal is to implement the feedback precisely while preserving accuracy, clarity, and the user's preferred style.
@@ -70,14 +77,40 @@ Ship via expedited service at no additional cost (arrives 2-3 days sooner), or
 Maintain standard shipping (no action needed). Please reply with your preference, and we'll proceed immediately. Sincerely, [Your Name] 
 """
 
-def revisor_node(state: ChatState) -> ChatState:
+def update_applicable_memories(state: ChatState, config: RunnableConfig):
+    """Reuse the selector's memories, re-selecting only unselected ones the feedback seems to touch"""
+    applicable = list(state.get("applicable_memories") or [])
+    unselected = memories_by_id(state, [memory_id for memory_id in state.get("memories") or [] if memory_id not in applicable])
+    candidates = {memory_id: unselected[memory_id] for _, memory_id in rank_by_overlap(state["feedback"], unselected)}
+
+    if not candidates:
+        log_event(config, f"Reusing {len(applicable)} selected memories for revision.")
+        return
+
+    log_event(config, f"Feedback touches {len(candidates)} unselected memories; re-selecting them.")
+    request = f"{state['original_request']}\n\nRevision feedback: {state['feedback']}"
+    try:
+        added = select_memories(request, candidates, config)
+    except DeadlineExceeded:
+        record_fallback(config, "select", "previous selection")
+        return
+    record_selection(state, added)
+    state["applicable_memories"] = applicable + added
+
+def revisor_node(state: ChatState, config: RunnableConfig) -> ChatState:
     """Node that creates the initial draft of the user input and generates AI response"""
-    state["action_log"].append("Revisor node was invoked.")
+    log_event(config, "Revisor node was invoked.")
+
+    update_applicable_memories(state, config)
+
+    if state.get("long_document") and state.get("sections"):
+        return revise_long_document(state, config)
     
-    # Build user preferences from memories
+    # Build user preferences from applicable memories
     user_preferences = ""
-    if state.get("memories") and len(state["memories"]) > 0:
-        user_preferences = "User Preferences:\n" + "\n".join([f"- {memory}" for memory in state["memories"]]) + "\n"
+    applicable_memories = memories_by_id(state, state.get("applicable_memories") or [])
+    if applicable_memories:
+        user_preferences = "User Preferences:\n" + "\n".join([f"- {memory}" for memory in applicable_memories.values()]) + "\n"
 
     # Build conversation history from past revisions
     messages = []
@@ -92,7 +125,7 @@ def revisor_node(state: ChatState) -> ChatState:
     
     # Add conversation history from past revisions
     if state["past_revisions"]:
-        for revision in state["past_revisions"]:
+        for revision in iter_revisions(state["past_revisions"]):
             # Add the draft as assistant message
             assistant_message = AIMessage(content=revision["draft"])
             messages.append(assistant_message)
@@ -108,18 +141,15 @@ def revisor_node(state: ChatState) -> ChatState:
     feedback_message = HumanMessage(content=state["feedback"])
     messages.append(feedback_message)
 
-    # Get response from OpenAI using conversation history
-    llm = ChatOpenAI(model="gpt-3.5-turbo", max_tokens=500)
-    response = llm.invoke(messages)
+    # Get response from the routed model using conversation history
+    response = invoke_routed("revise", config, messages, memory_count=len(state.get("applicable_memories") or []), max_tokens=500)
     
     # Extract the response
     ai_response = response.content
 
-    # Update state - store current draft and feedback as a dictionary
-    state["past_revisions"].append({
-        "draft": state["current_draft"],
-        "feedback": state["feedback"]
-    })
+    # Update state - store current draft and feedback as a delta against the previous revision
+    append_revision(state["past_revisions"], state["current_draft"], state["feedback"])
     state["current_draft"] = ai_response
+    state["candidate_drafts"] = []
 
     return state
\ No newline at end of file
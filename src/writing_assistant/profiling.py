@@ -0,0 +1,182 @@
+import cProfile
+import functools
+import glob
+import itertools
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict
+
+# "cprofile" writes .pstats files, "sample" writes collapsed stacks (.folded) for flamegraphs
+PROFILE_MODE = os.getenv("WRITING_ASSISTANT_PROFILE", "").lower()
+PROFILE_DIR = os.getenv("WRITING_ASSISTANT_PROFILE_DIR", "profiles")
+SAMPLE_INTERVAL = float(os.getenv("WRITING_ASSISTANT_PROFILE_INTERVAL", "0.005"))
+
+_run_counter = itertools.count(1)
+
+# Since Python 3.12 cProfile runs on sys.monitoring, which allows one active profiler per process.
+# cProfile sections therefore take turns: one that starts while another is running (a concurrent
+# session's node, or checkpointing inside a profiled node) runs unprofiled and is counted here.
+_cprofile_lock = threading.Lock()
+_skipped_sections: Counter = Counter()
+
+
+def _output_path(thread_id, label: str, extension: str) -> str:
+    directory = os.path.join(PROFILE_DIR, str(thread_id))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{os.getpid()}-{next(_run_counter):04d}-{label}.{extension}")
+
+
+def _collapse(frame, label: str) -> str:
+    """Turn a frame into a root-first, semicolon separated stack."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join([label] + names[::-1])
+
+
+class _Sampler(threading.Thread):
+    """Periodically sample the stack of one thread."""
+
+    def __init__(self, target_ident: int, label: str):
+        super().__init__(daemon=True)
+        self.target_ident = target_ident
+        self.label = label
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.target_ident)
+            if frame is not None:
+                self.stacks[_collapse(frame, self.label)] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _skip_section(label: str, reason: str):
+    if not _skipped_sections:
+        print(f"Profiling: skipped {label} ({reason}); see skipped_sections() for counts", file=sys.stderr)
+    _skipped_sections[label] += 1
+
+
+def skipped_sections() -> Dict[str, int]:
+    """Sections left unprofiled because another cProfile section was active, by label."""
+    return dict(_skipped_sections)
+
+
+@contextmanager
+def _cprofile_section(thread_id, label: str):
+    if not _cprofile_lock.acquire(blocking=False):
+        _skip_section(label, "another section is being profiled")
+        yield
+        return
+    try:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another tool (a debugger, coverage) already holds the profiler slot
+            _skip_section(label, "another profiling tool is active")
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(_output_path(thread_id, label, "pstats"))
+    finally:
+        _cprofile_lock.release()
+
+
+@contextmanager
+def profile_section(thread_id, label: str):
+    """Profile the enclosed block and write the result under the thread's directory."""
+    if PROFILE_MODE == "cprofile":
+        with _cprofile_section(thread_id, label):
+            yield
+    elif PROFILE_MODE == "sample":
+        sampler = _Sampler(threading.get_ident(), label)
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            with open(_output_path(thread_id, label, "folded"), 'w') as f:
+                for stack, count in sampler.stacks.items():
+                    f.write(f"{stack} {count}\n")
+    else:
+        yield
+
+
+def profile_node(name: str, node):
+    """Wrap a graph node so each run is profiled. Returns the node untouched when profiling is off."""
+    if not PROFILE_MODE:
+        return node
+
+    @functools.wraps(node)
+    def wrapper(state, config):
+        thread_id = config.get("configurable", {}).get("thread_id", "default")
+        with profile_section(thread_id, name):
+            return node(state, config)
+
+    return wrapper
+
+
+class ProfiledSerializer:
+    """Checkpoint serializer that profiles (de)serialization under the "checkpoint" directory."""
+
+    def __init__(self, serde):
+        self.serde = serde
+
+    def dumps_typed(self, obj: Any):
+        with profile_section("checkpoint", "dumps"):
+            return self.serde.dumps_typed(obj)
+
+    def loads_typed(self, data):
+        with profile_section("checkpoint", "loads"):
+            return self.serde.loads_typed(data)
+
+
+def profile_serializer():
+    """Return a profiled checkpoint serializer, or None to keep the default when profiling is off."""
+    if not PROFILE_MODE:
+        return None
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+    return ProfiledSerializer(JsonPlusSerializer())
+
+
+def summarize(directory: str) -> Dict[str, int]:
+    """Merge the profiles of one thread directory into combined output files."""
+    pstats_files = sorted(glob.glob(os.path.join(directory, "*.pstats")))
+    folded_files = sorted([
+        path for path in glob.glob(os.path.join(directory, "*.folded"))
+        if os.path.basename(path) != "combined.folded"
+    ])
+    if pstats_files:
+        import pstats
+        stats = pstats.Stats(*pstats_files)
+        stats.dump_stats(os.path.join(directory, "combined.prof"))
+        stats.sort_stats("cumulative").print_stats(25)
+    if folded_files:
+        stacks = Counter()
+        for path in folded_files:
+            with open(path) as f:
+                for line in f:
+                    stack, _, count = line.rstrip("\n").rpartition(" ")
+                    stacks[stack] += int(count)
+        with open(os.path.join(directory, "combined.folded"), 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+    return {"pstats": len(pstats_files), "folded": len(folded_files)}
+
+
+if __name__ == "__main__":
+    # Usage: python -m writing_assistant.profiling profiles/<thread_id>
+    print(summarize(sys.argv[1] if len(sys.argv) > 1 else PROFILE_DIR))
@@ -0,0 +1,111 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterator, List, Union
+
+# Words and the whitespace between them, so joining tokens reproduces the text exactly
+_TOKEN_PATTERN = re.compile(r"\s+|\S+")
+# Threads whose drafts are interned at once; the least recently used are released first
+MAX_INTERNED_THREADS = 256
+
+# A delta is a list of ops against the previous draft's tokens:
+#   int > 0  -> copy that many tokens
+#   int < 0  -> skip that many tokens
+#   str      -> insert this text
+Delta = List[Union[int, str]]
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text)
+
+
+def make_delta(previous: str, current: str) -> Delta:
+    """Encode `current` as a compact list of edits against `previous`."""
+    a, b = _tokenize(previous), _tokenize(current)
+    delta: Delta = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            delta.append(i2 - i1)
+            continue
+        if i2 > i1:
+            delta.append(i1 - i2)
+        if j2 > j1:
+            delta.append("".join(b[j1:j2]))
+    return delta
+
+
+def apply_delta(previous: str, delta: Delta) -> str:
+    """Rebuild a draft from the previous draft and its delta."""
+    tokens = _tokenize(previous)
+    position = 0
+    parts = []
+    for op in delta:
+        if isinstance(op, str):
+            parts.append(op)
+        elif op > 0:
+            parts.extend(tokens[position:position + op])
+            position += op
+        else:
+            position -= op
+    return "".join(parts)
+
+
+def iter_revisions(past_revisions: List[Dict[str, Any]]) -> Iterator[Dict[str, str]]:
+    """Lazily yield past revisions as {"draft", "feedback"} dicts.
+
+    The first entry stores its draft in full; later entries store a delta
+    against the draft before them.
+    """
+    draft = ""
+    for revision in past_revisions:
+        if "delta" in revision:
+            draft = apply_delta(draft, revision["delta"])
+        else:
+            draft = revision["draft"]
+        yield {"draft": draft, "feedback": revision["feedback"]}
+
+
+def last_revision_draft(past_revisions: List[Dict[str, Any]]) -> str:
+    """Reconstruct the draft of the most recent past revision."""
+    draft = ""
+    for revision in iter_revisions(past_revisions):
+        draft = revision["draft"]
+    return draft
+
+
+def append_revision(past_revisions: List[Dict[str, Any]], draft: str, feedback: str) -> List[Dict[str, Any]]:
+    """Append a revision, delta-encoding it against the previous one."""
+    if not past_revisions:
+        past_revisions.append({"draft": draft, "feedback": feedback})
+    else:
+        delta = make_delta(last_revision_draft(past_revisions), draft)
+        past_revisions.append({"delta": delta, "feedback": feedback})
+    return past_revisions
+
+
+_interned: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+_interned_lock = threading.Lock()
+
+
+def intern_draft(thread_id, text: str) -> str:
+    """Return a canonical copy of `text` so identical drafts are held once per thread."""
+    thread_id = str(thread_id)
+    key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    with _interned_lock:
+        drafts = _interned.get(thread_id)
+        if drafts is None:
+            drafts = _interned[thread_id] = {}
+            # Sessions that never reach handle_new_job (closed tabs) are evicted here instead
+            while len(_interned) > MAX_INTERNED_THREADS:
+                _interned.popitem(last=False)
+        else:
+            _interned.move_to_end(thread_id)
+        return drafts.setdefault(key, text)
+
+
+def drop_interned_drafts(thread_id):
+    """Release the interned drafts of a finished thread."""
+    with _interned_lock:
+        _interned.pop(str(thread_id), None)
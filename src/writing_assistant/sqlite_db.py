@@ -0,0 +1,23 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Iterator
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open an autocommit WAL connection to a SQLite file shared by threads and processes."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    return connection
+
+
+@contextmanager
+def connection(path: str) -> Iterator[sqlite3.Connection]:
+    """Open a connection with connect() that is closed afterwards."""
+    connection = connect(path)
+    try:
+        yield connection
+    finally:
+        connection.close()
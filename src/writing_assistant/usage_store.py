@@ -0,0 +1,73 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from . import sqlite_db
+
+# Days of per-day token usage kept
+USAGE_HISTORY_DAYS = 30
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+class UsageStore:
+    """Per-user, per-day token counters in SQLite, kept out of the users file so billing an LLM call is cheap."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("WRITING_ASSISTANT_USAGE_DB", "data/usage.db")
+        with sqlite_db.connection(self.path) as connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS token_usage (
+                    user TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    task TEXT NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    PRIMARY KEY (user, day, task)
+                )
+                """
+            )
+
+    def add(self, user: str, task: str, tokens: int):
+        """Add tokens used by one LLM task to the user's usage for today."""
+        if tokens <= 0:
+            return
+        with sqlite_db.connection(self.path) as connection:
+            connection.execute(
+                """
+                INSERT INTO token_usage (user, day, task, tokens) VALUES (?, ?, ?, ?)
+                ON CONFLICT (user, day, task) DO UPDATE SET tokens = tokens + excluded.tokens
+                """,
+                (user, _today(), task, tokens),
+            )
+
+    def usage(self, user: str, day: Optional[str] = None) -> Dict[str, int]:
+        """A user's usage for a UTC day (default today): {"total": ..., <task>: ...}."""
+        with sqlite_db.connection(self.path) as connection:
+            rows = connection.execute(
+                "SELECT task, tokens FROM token_usage WHERE user = ? AND day = ?", (user, day or _today())
+            ).fetchall()
+        usage = dict(rows)
+        usage["total"] = sum(usage.values())
+        return usage
+
+    def report(self, day: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """Usage of every user with any tokens on a UTC day (default today)."""
+        with sqlite_db.connection(self.path) as connection:
+            rows = connection.execute(
+                "SELECT user, task, tokens FROM token_usage WHERE day = ?", (day or _today(),)
+            ).fetchall()
+        report: Dict[str, Dict[str, int]] = {}
+        for user, task, tokens in rows:
+            usage = report.setdefault(user, {"total": 0})
+            usage[task] = tokens
+            usage["total"] += tokens
+        return report
+
+    def prune(self, keep_days: int = USAGE_HISTORY_DAYS) -> int:
+        """Delete usage older than `keep_days` days. Returns the number of rows deleted."""
+        cutoff = (datetime.now(timezone.utc).date() - timedelta(days=keep_days - 1)).isoformat()
+        with sqlite_db.connection(self.path) as connection:
+            return connection.execute("DELETE FROM token_usage WHERE day < ?", (cutoff,)).rowcount
@@ -1,76 +1,630 @@
+import argparse
+import atexit
+import hashlib
 import json
 import os
-from typing import Dict, Any, List
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Any, IO, Iterator, List, Optional, Tuple, Union
+
+from . import sqlite_db
+from .usage_store import UsageStore
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+# Memories unused for this many days are moved to the cold tier (0 disables archiving)
+ARCHIVE_AFTER_DAYS = int(os.getenv("WRITING_ASSISTANT_ARCHIVE_AFTER_DAYS", "60"))
+
+# Tokens a user may use per UTC day unless their record sets daily_token_budget (0 means unlimited)
+DAILY_TOKEN_BUDGET = int(os.getenv("WRITING_ASSISTANT_DAILY_TOKEN_BUDGET", "0"))
+
+# Selection hits are buffered in memory and written this often, so selections don't rewrite the users file
+# (0 writes every selection immediately)
+USAGE_FLUSH_SECONDS = float(os.getenv("WRITING_ASSISTANT_USAGE_FLUSH_SECONDS", "5"))
+
+# Bytes read at a time when streaming the users file
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Graph nodes, the UI, graph workers and extraction workers share the users file, so read-modify-write
+# cycles are serialized: across threads by _file_lock, across processes by flock on "<users file>.lock"
+_file_lock = threading.RLock()
+_lock_state = threading.local()
+
+# (users file, user ID) -> (file version, {memory ID: memory}), shared by every UserManager in the process
+_memory_index_cache: Dict[Tuple[str, str], Tuple[Tuple[int, int], Dict[str, str]]] = {}
+_memory_index_lock = threading.Lock()
+
+# users file -> user ID -> memory -> [hits, last used], waiting for the flusher thread
+_pending_hits: Dict[str, Dict[str, Dict[str, List[Any]]]] = {}
+_pending_hits_lock = threading.Lock()
+_flusher: Optional[threading.Thread] = None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def memory_id(memory: str) -> str:
+    """Stable short ID of a memory, derived from its text."""
+    return "m" + hashlib.sha1(memory.encode("utf-8")).hexdigest()[:10]
 
 
 class UserManager:
     """Simple user management with memories."""
-    
-    def __init__(self, file_path: str = "data/users.json"):
-        self.file_path = file_path
+
+    def __init__(self, file_path: Optional[str] = None):
+        self.file_path = file_path or os.getenv("WRITING_ASSISTANT_USERS_FILE", "data/users.json")
         self._ensure_file_exists()
-    
+
     def _ensure_file_exists(self):
         """Create the JSON file if it doesn't exist."""
         if not os.path.exists(self.file_path):
-            with open(self.file_path, 'w') as f:
-                json.dump({}, f)
-    
-    def _load_data(self) -> Dict[str, Any]:
-        """Load data from JSON file."""
+            try:
+                # Exclusive create, so a file another process just wrote is never truncated
+                with open(self.file_path, 'x') as f:
+                    json.dump({}, f)
+            except FileExistsError:
+                pass
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the users file lock of this thread and process; reentrant within a thread."""
+        with _file_lock:
+            depth = getattr(_lock_state, "depth", 0)
+            if depth == 0 and fcntl:
+                _lock_state.file = open(f"{self.file_path}.lock", 'a')
+                fcntl.flock(_lock_state.file, fcntl.LOCK_EX)
+            _lock_state.depth = depth + 1
+            try:
+                yield
+            finally:
+                _lock_state.depth = depth
+                if depth == 0 and fcntl:
+                    fcntl.flock(_lock_state.file, fcntl.LOCK_UN)
+                    _lock_state.file.close()
+
+    def _load_data(self, for_update: bool = False) -> Dict[str, Any]:
+        """Load data from JSON file.
+
+        Readers get {} for an unreadable file; writers (`for_update`) get an error instead,
+        so a bad read is never saved back over everyone's data.
+        """
         try:
             with open(self.file_path, 'r') as f:
                 return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+        except FileNotFoundError:
             return {}
-    
+        except json.JSONDecodeError as e:
+            if for_update:
+                raise RuntimeError(f"{self.file_path} is not valid JSON; refusing to overwrite it") from e
+            return {}
+
+    def _write_atomically(self, write: Callable[[IO[str]], None]):
+        """Write the users file through a temp file of its own, then swap it in."""
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(self.file_path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                write(f)
+            os.replace(temp_path, self.file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
     def _save_data(self, data: Dict[str, Any]):
-        """Save data to JSON file."""
-        with open(self.file_path, 'w') as f:
-            json.dump(data, f, indent=2)
-    
+        """Save data to JSON file, replacing it atomically."""
+        self._write_atomically(lambda f: json.dump(data, f, indent=2))
+
+    def _get_user_record(self, data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+        """Get a user's record from loaded data, adding any missing fields."""
+        user = data.setdefault(user_id, {})
+        user.setdefault("memories", [])
+        return user
+
     def get_user(self, user_id: str) -> Dict[str, Any]:
         """Get user data, create if doesn't exist."""
-        data = self._load_data()
-        if user_id not in data:
-            data[user_id] = {"memories": []}
-            self._save_data(data)
-        return data[user_id]
-    
+        user = self._load_data().get(user_id)
+        if user is not None:
+            return user
+        with self._locked():
+            data = self._load_data(for_update=True)
+            if user_id not in data:
+                data[user_id] = {"memories": []}
+                self._save_data(data)
+            return data[user_id]
+
     def get_memories(self, user_id: str) -> List[str]:
-        """Get user's memories."""
+        """Get user's active memories."""
         user = self.get_user(user_id)
         return user.get("memories", [])
-    
+
+    def get_memory_ids(self, user_id: str) -> List[str]:
+        """Get the IDs of a user's active memories."""
+        return [memory_id(memory) for memory in self.get_memories(user_id)]
+
+    def get_memory_index(self, user_id: str) -> Dict[str, str]:
+        """Map memory IDs to text for a user's active and archived memories.
+
+        Cached per user until the users file changes, so resolving IDs doesn't reread the file.
+        """
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return {}
+        version = (stat.st_mtime_ns, stat.st_size)
+        key = (os.path.abspath(self.file_path), user_id)
+        with _memory_index_lock:
+            cached = _memory_index_cache.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        # Don't create the user here; resolving IDs for an unknown user just finds nothing
+        user = self._load_data().get(user_id, {})
+        index = {
+            memory_id(memory): memory
+            for memory in user.get("memories", []) + user.get("archived_memories", [])
+        }
+        with _memory_index_lock:
+            _memory_index_cache[key] = (version, index)
+        return index
+
+    def resolve_memories(self, user_id: str, memory_ids: List[str]) -> List[str]:
+        """Get the text of each memory ID, in order, skipping IDs that no longer exist."""
+        if not memory_ids:
+            return []
+        index = self.get_memory_index(user_id)
+        return [index[i] for i in memory_ids if i in index]
+
     def add_memory(self, user_id: str, memory: str):
         """Add a memory to user."""
-        data = self._load_data()
-        if user_id not in data:
-            data[user_id] = {"memories": []}
-        
-        if "memories" not in data[user_id]:
-            data[user_id]["memories"] = []
-        
-        data[user_id]["memories"].append(memory)
-        self._save_data(data)
-    
+        self.add_memories(user_id, [memory])
+
     def add_memories(self, user_id: str, memories: List[str]):
         """Add multiple memories to user."""
-        data = self._load_data()
-        if user_id not in data:
-            data[user_id] = {"memories": []}
-        
-        if "memories" not in data[user_id]:
-            data[user_id]["memories"] = []
-        
-        data[user_id]["memories"].extend(memories)
-        self._save_data(data)
-    
+        with self._locked():
+            data = self._load_data(for_update=True)
+            user = self._get_user_record(data, user_id)
+            user["memories"].extend(memories)
+            stats = user.setdefault("memory_stats", {})
+            for memory in memories:
+                stats.setdefault(memory, {"hits": 0, "last_used": None, "added": _now()})
+            self._save_data(data)
+
     def get_all_users(self) -> List[str]:
         """Get list of all user IDs."""
         data = self._load_data()
         return list(data.keys())
 
+    def record_memory_usage(self, user_id: str, memories: List[str]):
+        """Count a hit and update the last-used time for each selected memory.
+
+        Hits are buffered and written every USAGE_FLUSH_SECONDS by a background thread;
+        flush_memory_usage() writes them right away.
+        """
+        if not memories:
+            return
+        now = _now()
+        with _pending_hits_lock:
+            user_hits = _pending_hits.setdefault(self.file_path, {}).setdefault(user_id, {})
+            for memory in memories:
+                entry = user_hits.setdefault(memory, [0, now])
+                entry[0] += 1
+                entry[1] = now
+        if USAGE_FLUSH_SECONDS <= 0:
+            self.flush_memory_usage()
+        else:
+            _start_flusher()
+
+    def flush_memory_usage(self):
+        """Write this file's buffered selection hits with a single save."""
+        with _pending_hits_lock:
+            hits = _pending_hits.pop(self.file_path, None)
+        if not hits:
+            return
+        try:
+            with self._locked():
+                data = self._load_data(for_update=True)
+                for user_id, user_hits in hits.items():
+                    stats = self._get_user_record(data, user_id).setdefault("memory_stats", {})
+                    for memory, (count, last_used) in user_hits.items():
+                        entry = stats.setdefault(memory, {"hits": 0, "last_used": None, "added": last_used})
+                        entry["hits"] += count
+                        entry["last_used"] = last_used
+                self._save_data(data)
+        except Exception:
+            # Keep the hits for the next flush
+            with _pending_hits_lock:
+                for user_id, user_hits in hits.items():
+                    for memory, (count, last_used) in user_hits.items():
+                        entry = _pending_hits.setdefault(self.file_path, {}).setdefault(user_id, {}).setdefault(memory, [0, last_used])
+                        entry[0] += count
+            raise
+
+    def _with_pending_hits(self, user_id: str, stats: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Overlay hits that haven't been flushed yet on stats read from the file."""
+        with _pending_hits_lock:
+            user_hits = dict(_pending_hits.get(self.file_path, {}).get(user_id, {}))
+        if not user_hits:
+            return stats
+        stats = dict(stats)
+        for memory, (count, last_used) in user_hits.items():
+            entry = dict(stats.get(memory) or {"hits": 0, "added": last_used})
+            entry["hits"] = entry.get("hits", 0) + count
+            entry["last_used"] = last_used
+            stats[memory] = entry
+        return stats
+
+    def get_memory_stats(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """Get hit counts and timestamps keyed by memory."""
+        return self._with_pending_hits(user_id, self.get_user(user_id).get("memory_stats", {}))
+
+    def archive_cold_memories(self, user_id: str, max_idle_days: int = ARCHIVE_AFTER_DAYS) -> List[str]:
+        """Move memories unused for `max_idle_days` into the cold tier and return them."""
+        if max_idle_days <= 0:
+            return []
+        # Archiving goes by last use, so write any buffered hits first
+        self.flush_memory_usage()
+        with self._locked():
+            data = self._load_data(for_update=True)
+            if user_id not in data:
+                return []
+            user = self._get_user_record(data, user_id)
+            stats = user.setdefault("memory_stats", {})
+            cutoff = datetime.now(timezone.utc) - timedelta(days=max_idle_days)
+
+            active, archived = [], []
+            started_clock = False
+            for memory in user["memories"]:
+                # Memories from before usage tracking start their idle clock now
+                if memory not in stats:
+                    stats[memory] = {"hits": 0, "last_used": None, "added": _now()}
+                    started_clock = True
+                entry = stats[memory]
+                last_seen = datetime.fromisoformat(entry["last_used"] or entry["added"])
+                (archived if last_seen < cutoff else active).append(memory)
+
+            # Most calls archive nothing; don't rewrite the users file for them
+            if archived or started_clock:
+                user["memories"] = active
+                user.setdefault("archived_memories", []).extend(archived)
+                self._save_data(data)
+            return archived
+
+    def get_archived_memories(self, user_id: str) -> List[str]:
+        """Get user's archived (cold) memories."""
+        return self.get_user(user_id).get("archived_memories", [])
+
+    def search_memories(self, user_id: str, query: str, include_archived: bool = True) -> List[Dict[str, Any]]:
+        """Find active (and optionally archived) memories containing `query`."""
+        user = self.get_user(user_id)
+        stats = self._with_pending_hits(user_id, user.get("memory_stats", {}))
+        needle = query.lower()
+        tiers = [(user.get("memories", []), False)]
+        if include_archived:
+            tiers.append((user.get("archived_memories", []), True))
+
+        results = []
+        for memories, is_archived in tiers:
+            for memory in memories:
+                if needle in memory.lower():
+                    entry = stats.get(memory, {})
+                    results.append({
+                        "id": memory_id(memory),
+                        "memory": memory,
+                        "archived": is_archived,
+                        "hits": entry.get("hits", 0),
+                        "last_used": entry.get("last_used"),
+                    })
+        return results
+
+    def restore_memory(self, user_id: str, memory: str) -> bool:
+        """Move an archived memory back to the active set."""
+        with self._locked():
+            data = self._load_data(for_update=True)
+            user = self._get_user_record(data, user_id)
+            archived = user.get("archived_memories", [])
+            if memory not in archived:
+                return False
+            archived.remove(memory)
+            user["memories"].append(memory)
+            # Restart the idle clock so the memory isn't archived again right away
+            entry = user.setdefault("memory_stats", {}).setdefault(memory, {"hits": 0, "last_used": None, "added": _now()})
+            entry["last_used"] = _now()
+            self._save_data(data)
+            return True
+
+    def add_pending_memories(self, user_id: str, memories: List[str]):
+        """Queue suggested memories to offer the user on their next visit."""
+        with self._locked():
+            data = self._load_data(for_update=True)
+            pending = self._get_user_record(data, user_id).setdefault("pending_memories", [])
+            # Unique, since the confirmation checkboxes are keyed by memory
+            pending.extend([memory for memory in dict.fromkeys(memories) if memory not in pending])
+            self._save_data(data)
+
+    def get_pending_memories(self, user_id: str) -> List[str]:
+        """Get suggested memories waiting for the user's confirmation."""
+        return self.get_user(user_id).get("pending_memories", [])
+
+    def resolve_pending_memories(self, user_id: str, accepted: List[str]):
+        """Save the accepted suggestions and clear the pending list."""
+        with self._locked():
+            data = self._load_data(for_update=True)
+            user = self._get_user_record(data, user_id)
+            user["pending_memories"] = []
+            self._save_data(data)
+        if accepted:
+            self.add_memories(user_id, accepted)
+
+    def get_token_budget(self, user_id: str) -> int:
+        """Get the user's daily token budget (0 means unlimited)."""
+        user = self._load_data().get(user_id, {})
+        return user.get("daily_token_budget", DAILY_TOKEN_BUDGET)
+
+    def set_token_budget(self, user_id: str, tokens: Optional[int]):
+        """Set the user's daily token budget, or go back to the default with None."""
+        with self._locked():
+            data = self._load_data(for_update=True)
+            user = self._get_user_record(data, user_id)
+            if tokens is None:
+                user.pop("daily_token_budget", None)
+            else:
+                user["daily_token_budget"] = tokens
+            self._save_data(data)
+
+    def get_token_budgets(self) -> Dict[str, int]:
+        """Every user's daily token budget, from a single read of the users file."""
+        return {user_id: user.get("daily_token_budget", DAILY_TOKEN_BUDGET) for user_id, user in self._load_data().items()}
+
+    def _iter_users(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Stream (user_id, record) pairs from the users file, holding one user in memory at a time."""
+        decoder = json.JSONDecoder()
+        with open(self.file_path, 'r') as f:
+            buffer = f.read(STREAM_CHUNK_SIZE)
+            position = 0
+            eof = not buffer
+
+            def skip(characters: str):
+                nonlocal buffer, position, eof
+                while True:
+                    while position < len(buffer) and buffer[position] in characters:
+                        position += 1
+                    if position < len(buffer) or eof:
+                        return
+                    buffer, position = f.read(STREAM_CHUNK_SIZE), 0
+                    eof = not buffer
+
+            def decode():
+                nonlocal buffer, position, eof
+                read_size = STREAM_CHUNK_SIZE
+                while True:
+                    try:
+                        value, end = decoder.raw_decode(buffer, position)
+                        position = end
+                        return value
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                        # The value spans the end of the buffer, read more and try again
+                        chunk = f.read(read_size)
+                        eof = not chunk
+                        buffer, position = buffer[position:] + chunk, 0
+                        read_size *= 2
+
+            skip(" \t\r\n")
+            if position >= len(buffer) or buffer[position] != "{":
+                return
+            position += 1
+            while True:
+                skip(" \t\r\n,")
+                if position >= len(buffer) or buffer[position] == "}":
+                    return
+                user_id = decode()
+                skip(" \t\r\n:")
+                yield user_id, decode()
+                # Drop what has been parsed so the buffer doesn't grow with the file
+                buffer, position = buffer[position:], 0
+
+    def export_jsonl(self, destination: Union[str, IO[str]], progress: Optional[Callable[[int], None]] = None) -> int:
+        """Stream every memory to JSONL, one {"user", "memory", ...} record per line.
+
+        Users without memories are written as a bare {"user"} record so they survive a round trip.
+        Returns the number of records written.
+        """
+        out = open(destination, 'w') if isinstance(destination, str) else destination
+        count = 0
+        try:
+            for user_id, user in self._iter_users():
+                stats = user.get("memory_stats", {})
+                memories = [(memory, False) for memory in user.get("memories", [])]
+                memories += [(memory, True) for memory in user.get("archived_memories", [])]
+                if not memories:
+                    out.write(json.dumps({"user": user_id}) + "\n")
+                    count += 1
+                for memory, archived in memories:
+                    record = {"user": user_id, "memory": memory, "archived": archived}
+                    if memory in stats:
+                        record["stats"] = stats[memory]
+                    out.write(json.dumps(record) + "\n")
+                    count += 1
+                    if progress and count % 10000 == 0:
+                        progress(count)
+        finally:
+            if isinstance(destination, str):
+                out.close()
+        if progress:
+            progress(count)
+        return count
+
+    def _merge_import(self, spool: sqlite3.Connection) -> Tuple[int, int]:
+        """Merge spooled import records into the users file in one streaming pass, then swap it in.
+
+        Returns (imported, duplicates).
+        """
+        imported = duplicates = 0
+
+        def merge(user_id: str, user: Dict[str, Any]):
+            nonlocal imported, duplicates
+            user.setdefault("memories", [])
+            known = set(user["memories"]) | set(user.get("archived_memories", []))
+            for (line,) in spool.execute("SELECT record FROM records WHERE user = ? ORDER BY id", (user_id,)):
+                record = json.loads(line)
+                memory = record.get("memory")
+                if memory is None:
+                    continue
+                if memory in known:
+                    duplicates += 1
+                    continue
+                known.add(memory)
+                if record.get("archived"):
+                    user.setdefault("archived_memories", []).append(memory)
+                else:
+                    user["memories"].append(memory)
+                user.setdefault("memory_stats", {}).setdefault(
+                    memory, record.get("stats") or {"hits": 0, "last_used": None, "added": _now()}
+                )
+                imported += 1
+            spool.execute("DELETE FROM records WHERE user = ?", (user_id,))
+
+        def write(out: IO[str]):
+            first = True
+
+            def write_user(user_id, user):
+                nonlocal first
+                out.write(("\n" if first else ",\n") + f"  {json.dumps(user_id)}: {json.dumps(user)}")
+                first = False
+
+            out.write("{")
+            # A corrupt users file fails here, before anything replaces it
+            for user_id, user in self._iter_users():
+                merge(user_id, user)
+                write_user(user_id, user)
+            # Whatever is left belongs to users the file doesn't have yet
+            new_users = [user_id for (user_id,) in spool.execute("SELECT user FROM records GROUP BY user ORDER BY MIN(id)")]
+            for user_id in new_users:
+                user = {"memories": []}
+                merge(user_id, user)
+                write_user(user_id, user)
+            out.write("\n}\n")
+
+        self._write_atomically(write)
+        return imported, duplicates
+
+    def import_jsonl(self, source: Union[str, IO[str]], batch_size: int = 10000,
+                     progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+        """Bulk upsert memories from JSONL (as written by export_jsonl), skipping duplicates.
+
+        Records are spooled to a temporary SQLite file in transactions of `batch_size`, then merged
+        into the users file in a single streaming pass that replaces it atomically.
+        """
+        totals = {"read": 0, "imported": 0, "duplicates": 0, "batches": 0}
+        with tempfile.TemporaryDirectory() as spool_dir, \
+                sqlite_db.connection(os.path.join(spool_dir, "import.db")) as spool:
+            spool.execute("CREATE TABLE records (id INTEGER PRIMARY KEY AUTOINCREMENT, user TEXT NOT NULL, record TEXT NOT NULL)")
+            spool.execute("CREATE INDEX records_user ON records (user)")
+            batch: List[Tuple[str, str]] = []
+
+            def flush():
+                with spool:
+                    spool.execute("BEGIN")
+                    spool.executemany("INSERT INTO records (user, record) VALUES (?, ?)", batch)
+                batch.clear()
+                totals["batches"] += 1
+                if progress:
+                    progress(dict(totals))
+
+            lines = open(source, 'r') if isinstance(source, str) else source
+            try:
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    batch.append((json.loads(line)["user"], line))
+                    totals["read"] += 1
+                    if len(batch) >= batch_size:
+                        flush()
+            finally:
+                if isinstance(source, str):
+                    lines.close()
+            if batch:
+                flush()
+
+            with self._locked():
+                totals["imported"], totals["duplicates"] = self._merge_import(spool)
+        if progress:
+            progress(dict(totals))
+        return totals
+
+def flush_memory_usage():
+    """Write the buffered selection hits of every users file now."""
+    with _pending_hits_lock:
+        file_paths = list(_pending_hits)
+    for file_path in file_paths:
+        UserManager(file_path).flush_memory_usage()
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(USAGE_FLUSH_SECONDS)
+        try:
+            flush_memory_usage()
+        except Exception as e:
+            print(f"Failed to write memory usage, will retry: {e}", file=sys.stderr)
+
+
+def _start_flusher():
+    global _flusher
+    with _pending_hits_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_periodically, name="memory-usage-flusher", daemon=True)
+            _flusher.start()
+
+
+# Buffered hits would otherwise be lost on a normal exit
+atexit.register(flush_memory_usage)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage users and memories.")
+    parser.add_argument("--users-file", help="Defaults to $WRITING_ASSISTANT_USERS_FILE or data/users.json.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    memories_parser = commands.add_parser("memories", help="Print a user's memories.")
+    memories_parser.add_argument("user")
+    export_parser = commands.add_parser("export", help="Stream all memories to JSONL.")
+    export_parser.add_argument("file", help="Output path, or - for stdout.")
+    import_parser = commands.add_parser("import", help="Bulk upsert memories from JSONL.")
+    import_parser.add_argument("file", help="Input path, or - for stdin.")
+    import_parser.add_argument("--batch-size", type=int, default=10000)
+    budget_parser = commands.add_parser("budget", help="Show or set a user's daily token budget.")
+    budget_parser.add_argument("user")
+    budget_parser.add_argument("tokens", nargs="?", help="New daily budget (0 for unlimited, 'default' to reset).")
+    args = parser.parse_args()
+
+    user_manager = UserManager(args.users_file)
+    if args.command == "memories":
+        print(user_manager.get_memories(args.user))
+    elif args.command == "export":
+        user_manager.export_jsonl(sys.stdout if args.file == "-" else args.file,
+                                  progress=lambda n: print(f"Exported {n} records", file=sys.stderr))
+    elif args.command == "import":
+        totals = user_manager.import_jsonl(sys.stdin if args.file == "-" else args.file, batch_size=args.batch_size,
+                                           progress=lambda t: print(f"Read {t['read']}, imported {t['imported']}, "
+                                                                    f"skipped {t['duplicates']} duplicates", file=sys.stderr))
+        print(json.dumps(totals), file=sys.stderr)
+    elif args.command == "budget":
+        if args.tokens is not None:
+            user_manager.set_token_budget(args.user, None if args.tokens == "default" else int(args.tokens))
+        print(json.dumps({"budget": user_manager.get_token_budget(args.user),
+                          "today": UsageStore().usage(args.user)}))
+
+
 if __name__ == "__main__":
-    user_manager = UserManager()
-    print(user_manager.get_memories("sample_user_123"))
\ No newline at end of file
+    main()
@@ -1,33 +1,75 @@
 import streamlit as st
 import sys
 import os
+import time
 import dotenv
 import uuid
+from collections import deque
 from langgraph.types import Command
 from uuid import uuid4
 
+# Measured as early as possible so the reported run time covers the whole script
+RUN_STARTED = time.perf_counter()
+
 dotenv.load_dotenv()
 
 # Add src directory to Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 
 from writing_assistant.chat_graph import create_chat_graph, initialize_chat_state
-from writing_assistant.user_manager import UserManager
+from writing_assistant.user_manager import UserManager, memory_id
+from writing_assistant.event_log import get_event_log, drop_event_log, log_event
+from writing_assistant.revision_store import intern_draft, drop_interned_drafts
+from writing_assistant.extraction_worker import ExtractionWorkerPool
+from writing_assistant.budgets import budget_status, usage_summary
+
+MEMORY_PAGE_SIZE = 20
+CHAT_HISTORY_WINDOW = 20
+# Graph worker processes to run the chat graph on (0 runs it in the script run). writing_assistant.graph_worker,
+# and the SQLite checkpointer it needs, are only imported when this is set.
+GRAPH_WORKERS = int(os.getenv("WRITING_ASSISTANT_GRAPH_WORKERS", "0"))
+
+
+def invoke_graph(graph_input):
+    """Run the chat graph for this session, stopping the run with an error if the graph workers don't answer in time."""
+    try:
+        return st.session_state.chat_graph.invoke(graph_input, config=st.session_state.config)
+    except TimeoutError as e:
+        # Only GraphClient raises TimeoutError itself; in-process deadline misses are handled inside the graph
+        if not GRAPH_WORKERS:
+            raise
+        log_event(st.session_state.config, "Graph workers did not answer in time.", source="ui", error=str(e))
+        st.error(f"{e}. The graph workers may be down; please try again.")
+        st.stop()
 
 
 def add_new_message(role, content, type=None):
     """Handle new message."""
+    if type == "draft":
+        content = intern_draft(st.session_state.config["configurable"]["thread_id"], content)
     st.session_state.messages.append({"role": role, "content": content, "message_type": type})
 
 def display_draft_message(message, message_index, column):
     """Display a draft message with approve/reset action buttons."""
     with column.chat_message(message["role"]):
-        st.markdown(message["content"])
+        candidates = st.session_state.current_state.get("candidate_drafts")
+        if candidates and message_index == len(st.session_state.messages) - 1:
+            st.write("Pick a draft to continue with:")
+            tabs = st.tabs([f"Option {i}" for i in range(1, len(candidates) + 1)])
+            for i, (tab, candidate) in enumerate(zip(tabs, candidates)):
+                with tab:
+                    st.markdown(candidate)
+                    if st.button("Use this draft", key=f"pick_{message_index}_{i}"):
+                        handle_candidate_pick(i)
+        else:
+            st.markdown(message["content"])
         
         # Show memories used in this draft
         if st.session_state.current_state.get("applicable_memories"):
             with st.expander("Memories Used in This Draft", expanded=False):
-                memories = st.session_state.current_state["applicable_memories"]
+                memories = user_manager.resolve_memories(
+                    st.session_state.current_state["user"], st.session_state.current_state["applicable_memories"]
+                )
                 if memories:
                     for i, memory in enumerate(memories, 1):
                         st.write(f"{i}. {memory}")
@@ -78,18 +120,18 @@ def display_memory_message(message, message_index, column):
                         if st.button("Save", key=f"save_memory_{i}"):
                             # Update the memory in session state
                             st.session_state.current_state["suggested_memories"][i] = edited_memory
-                            st.session_state.current_state["action_log"].append(f"User edited memory #{i+1}")
+                            log_event(st.session_state.config, f"User edited memory #{i+1}", source="ui")
                             st.session_state.editing_memory = None
                             
                             # Remove the old memory message and recreate it with updated state
                             st.session_state.messages.pop()
                             add_new_message("assistant", st.session_state.current_state["suggested_memories"], "memory")
-                            st.rerun()
+                            st.rerun(scope="fragment")
                     
                     with col2:
                         if st.button("Cancel", key=f"cancel_memory_{i}"):
                             st.session_state.editing_memory = None
-                            st.rerun()
+                            st.rerun(scope="fragment")
                 else:
                     # Display mode - show memory text and action buttons
                     st.write(f"{i+1}. {memory}")
@@ -98,14 +140,14 @@ def display_memory_message(message, message_index, column):
                     with col1:
                         if st.button(f"Edit", key=f"edit_memory_{i}"):
                             st.session_state.editing_memory = i
-                            st.rerun()
+                            st.rerun(scope="fragment")
                     
                     with col2:
                         if st.button(f"Delete", key=f"delete_memory_{i}"):
                             # Remove from suggested memories list using index
                             if i < len(st.session_state.current_state["suggested_memories"]):
                                 st.session_state.current_state["suggested_memories"].pop(i)
-                                st.session_state.current_state["action_log"].append(f"User deleted memory #{i+1}")
+                                log_event(st.session_state.config, f"User deleted memory #{i+1}", source="ui")
                                 
                                 # Reset editing state if we were editing a memory after the deleted one
                                 if st.session_state.editing_memory is not None and st.session_state.editing_memory >= i:
@@ -114,7 +156,7 @@ def display_memory_message(message, message_index, column):
                                 # Remove the old memory message and recreate it with updated state
                                 st.session_state.messages.pop()
                                 add_new_message("assistant", st.session_state.current_state["suggested_memories"], "memory")
-                                st.rerun()
+                                st.rerun(scope="fragment")
             else:
                 # For older messages, just display the memory without buttons
                 st.write(f"{i+1}. {memory}")
@@ -122,11 +164,11 @@ def display_memory_message(message, message_index, column):
         # Only show the save memories button if this is the last message and no memory is being edited
         if message_index == len(st.session_state.messages) - 1 and st.session_state.editing_memory is None:
             if st.button("Save Memories"):
-                st.session_state.current_state["action_log"].append(f"User confirmed memories. Resuming graph with ID: {str(st.session_state.config['configurable']['thread_id'])[:6]}...")
+                log_event(st.session_state.config, f"User confirmed memories. Resuming graph with ID: {str(st.session_state.config['configurable']['thread_id'])[:6]}...", source="ui")
                 # Store the memories the user kept
                 saved_memories = st.session_state.current_state["suggested_memories"].copy()
                 # Pass the user's modified memories to the graph
-                st.session_state.chat_graph.invoke(Command(resume={"action": "confirm_memories", "new_memories": saved_memories}), config=st.session_state.config)
+                invoke_graph(Command(resume={"action": "confirm_memories", "new_memories": saved_memories}))
                 # Keep the saved memories in suggested_memories for display
                 st.session_state.current_state["suggested_memories"] = saved_memories
                 add_new_message("assistant", "Memories saved.", "status")
@@ -137,25 +179,41 @@ def display_memory_message(message, message_index, column):
 
 def handle_draft_approval():
     """Handle draft approval action."""
-    st.session_state.current_state["action_log"].append(f"User approved draft. Resuming graph with ID: {str(st.session_state.config['configurable']['thread_id'])[:6]}...")
+    log_event(st.session_state.config, f"User approved draft. Resuming graph with ID: {str(st.session_state.config['configurable']['thread_id'])[:6]}...", source="ui")
     st.session_state.feedback_mode = False
-    result = st.session_state.chat_graph.invoke(Command(resume={"action": "approve", "feedback": ""}), config=st.session_state.config)
+    result = invoke_graph(Command(resume={"action": "approve", "feedback": ""}))
     st.session_state.current_state = result
     # Only check for memories if there are past revisions AND no memory message already exists
     if len(st.session_state.current_state["past_revisions"]) > 0 and not any(msg.get("message_type") == "memory" for msg in st.session_state.messages):
         add_new_message("assistant", "Approved.Checking for new memories...", "status")
-        handle_memory_confirmation()
+        if st.session_state.current_state.get("__interrupt__"):
+            handle_memory_confirmation()
+        else:
+            # Extraction found nothing, or was deferred to the background
+            add_new_message("assistant", "No new memories to confirm right now.", "status")
+            st.session_state.job_completed = True
     else:
         # Job completed without memories to extract
         st.session_state.job_completed = True
     st.rerun()
 
 
+def handle_candidate_pick(index):
+    """Handle picking one of several candidate drafts."""
+    log_event(st.session_state.config, f"User picked candidate #{index + 1}. Resuming graph with ID: {str(st.session_state.config['configurable']['thread_id'])[:6]}...", source="ui")
+    result = invoke_graph(Command(resume={"action": "pick", "index": index}))
+    st.session_state.current_state = result
+    # Replace the candidates message with the chosen draft
+    st.session_state.messages.pop()
+    add_new_message("assistant", result["current_draft"], "draft")
+    st.rerun()
+
+
 def handle_draft_reset():
     """Handle draft reset action."""
-    st.session_state.current_state["action_log"].append(f"User requested reset. Resuming graph with ID: {str(st.session_state.config['configurable']['thread_id'])[:6]}...")
+    log_event(st.session_state.config, f"User requested reset. Resuming graph with ID: {str(st.session_state.config['configurable']['thread_id'])[:6]}...", source="ui")
     st.session_state.feedback_mode = False
-    result = st.session_state.chat_graph.invoke(Command(resume={"action": "reset"}), config=st.session_state.config)
+    result = invoke_graph(Command(resume={"action": "reset"}))
     st.session_state.current_state = result
     st.session_state.messages = []
     st.rerun()
@@ -172,13 +230,15 @@ def handle_new_job():
     st.session_state.feedback_mode = False
     st.session_state.job_completed = False
     st.session_state.editing_memory = None
+    drop_event_log(st.session_state.config["configurable"]["thread_id"])
+    drop_interned_drafts(st.session_state.config["configurable"]["thread_id"])
     st.session_state.config = {"configurable": {"thread_id": uuid.uuid4()}}
     
     # Initialize new state but keep user and memories
     st.session_state.current_state = initialize_chat_state()
     st.session_state.current_state["user"] = current_user
     st.session_state.current_state["memories"] = current_memories
-    st.session_state.current_state["action_log"] = [f'New job started. ConfigID: {str(st.session_state.config["configurable"]["thread_id"])[:6]}...']
+    log_event(st.session_state.config, f'New job started. ConfigID: {str(st.session_state.config["configurable"]["thread_id"])[:6]}...', source="ui")
     
     st.rerun()
 
@@ -186,12 +246,17 @@ def handle_new_job():
 def initialize_session_state():
     """Initialize all session state variables."""
     if "chat_graph" not in st.session_state:
-        st.session_state.chat_graph = create_chat_graph()
+        # With graph workers, invoke() submits a job to the worker processes and waits for its result
+        if GRAPH_WORKERS:
+            from writing_assistant.graph_worker import GraphClient
+            st.session_state.chat_graph = GraphClient()
+        else:
+            st.session_state.chat_graph = create_chat_graph()
     if "config" not in st.session_state:
         st.session_state.config = {"configurable": {"thread_id": uuid.uuid4()}}
     if "current_state" not in st.session_state:
         st.session_state.current_state = initialize_chat_state()
-        st.session_state.current_state["action_log"] = [f'Graph was initialized. ConfigID: {str(st.session_state.config["configurable"]["thread_id"])[:6]}...']
+        log_event(st.session_state.config, f'Graph was initialized. ConfigID: {str(st.session_state.config["configurable"]["thread_id"])[:6]}...', source="ui")
     if "messages" not in st.session_state:
         st.session_state.messages = []
     if "feedback_mode" not in st.session_state:
@@ -204,17 +269,24 @@ def initialize_session_state():
         st.session_state.persisted_user = "None Selected"
     
 
+def budget_used_up():
+    """Refuse new LLM work for a user over the hard limit of their daily token budget."""
+    if budget_status(st.session_state.current_state["user"]) != "hard":
+        return False
+    st.error("This user's daily token budget is used up. Try again tomorrow (UTC) or raise the budget.")
+    return True
+
+
 def handle_feedback_mode(new_message):
     """Handle feedback mode interaction."""
+    if budget_used_up():
+        return
     add_new_message("user", f"Feedback: {new_message}")
     display_user_message({'role': 'user', 'content': f"Feedback: {new_message}"}, st)
-    st.session_state.current_state["action_log"].append(f"User provided feedback: {new_message}")
+    log_event(st.session_state.config, "User provided feedback.", source="ui", feedback=new_message)
     
     try:
-        result = st.session_state.chat_graph.invoke(
-            Command(resume={"action": "revise", "feedback": new_message}), 
-            config=st.session_state.config
-        )
+        result = invoke_graph(Command(resume={"action": "revise", "feedback": new_message}))
         st.session_state.current_state = result
         
         if result.get("current_draft"):
@@ -227,13 +299,17 @@ def handle_feedback_mode(new_message):
 
 def handle_normal_mode(new_message):
     """Handle normal chat mode interaction."""
+    if budget_used_up():
+        return
     add_new_message("user", new_message)
     display_user_message({'role': 'user', 'content': new_message}, st)
-    st.session_state.current_state["action_log"].append("User sent a request.")
+    log_event(st.session_state.config, "User sent a request.", source="ui")
     st.session_state.current_state["original_request"] = new_message
+    st.session_state.current_state["long_document"] = st.session_state.get("long_document", False)
+    st.session_state.current_state["num_candidates"] = st.session_state.get("num_candidates", 1)
     
     try:
-        result = st.session_state.chat_graph.invoke(st.session_state.current_state, config=st.session_state.config)
+        result = invoke_graph(st.session_state.current_state)
 
         st.session_state.current_state = result
         
@@ -261,10 +337,21 @@ def handle_memory_confirmation():
         add_new_message("assistant", interrupt_data['suggested_memories'], "memory")
 
 
-def setup_chat_interface(column):
-    """Setup and handle the chat interface."""
-    # Display chat messages from history on app rerun
-    for i, message in enumerate(st.session_state.messages):
+@st.fragment
+def display_chat_history(column):
+    """Display chat messages, rerunning only this fragment for local interactions."""
+    started = time.perf_counter()
+    messages = st.session_state.messages
+
+    # Older messages are only rendered on request so long sessions stay fast
+    first_index = max(0, len(messages) - CHAT_HISTORY_WINDOW)
+    if first_index > 0 and not column.toggle(f"Show {first_index} earlier messages", key="show_earlier_messages"):
+        messages_to_show = range(first_index, len(messages))
+    else:
+        messages_to_show = range(len(messages))
+
+    for i in messages_to_show:
+        message = messages[i]
         if message["role"] == "assistant" and message.get("message_type") == "draft":
             display_draft_message(message, i, column)
         elif message["role"] == "assistant" and message.get("message_type") == "memory":
@@ -272,6 +359,14 @@ def setup_chat_interface(column):
         else:
             display_user_message(message, column)
 
+    record_run_time("chat fragment", started)
+
+
+def setup_chat_interface(column):
+    """Setup and handle the chat interface."""
+    # Display chat messages from history on app rerun
+    display_chat_history(column)
+
     # Show new job button if job is completed
     if st.session_state.job_completed:
         if st.button("Start a New Task", key="new_job_button"):
@@ -292,11 +387,156 @@ def setup_chat_interface(column):
             handle_normal_mode(new_message)
 
 
+@st.cache_data(max_entries=8)
+def load_available_users(file_mtime):
+    """Load user IDs, cached until the users file changes."""
+    return user_manager.get_all_users()
+
+
+@st.cache_data(max_entries=64)
+def load_pending_memories(user_id, file_mtime):
+    """Load a user's suggested memories, cached until the users file changes."""
+    return user_manager.get_pending_memories(user_id)
+
+
+@st.cache_data(max_entries=64)
+def filter_memories(memories, query):
+    """Return (number, memory) pairs whose text contains the search query."""
+    needle = query.lower()
+    return [(i, memory) for i, memory in enumerate(memories, 1) if needle in memory.lower()]
+
+
+@st.cache_data(max_entries=256)
+def render_memory_page(page):
+    """Render a page of (number, memory) pairs as a single markdown list."""
+    return "\n".join([f"{i}. {memory}" for i, memory in page])
+
+
+@st.cache_resource
+def start_extraction_workers(workers):
+    """Start one pool of memory extraction queue workers per process."""
+    return ExtractionWorkerPool(workers=workers).start()
+
+
+@st.cache_resource
+def start_graph_workers(workers):
+    """Start one pool of graph worker processes per server."""
+    from writing_assistant.graph_worker import GraphWorkerPool
+    return GraphWorkerPool(workers).start()
+
+
+@st.cache_data
+def get_graph_image():
+    """Draw the graph once per process instead of on every rerun."""
+    return create_chat_graph().get_graph().draw_mermaid_png()
+
+
+def display_memories():
+    """Display the current memories with search and pagination."""
+    st.sidebar.header("Current Memories")
+    memories = user_manager.resolve_memories(st.session_state.current_state["user"], st.session_state.current_state["memories"])
+    if not memories:
+        st.sidebar.write("No memories stored yet.")
+        return
+
+    query = st.sidebar.text_input("Search memories", key="memory_search")
+    matches = filter_memories(tuple(memories), query)
+    if not matches:
+        st.sidebar.write("No memories match your search.")
+        return
+
+    page_count = (len(matches) - 1) // MEMORY_PAGE_SIZE + 1
+    page = 1
+    if page_count > 1:
+        # Keep the page in range when a narrower search shrinks the result set
+        if st.session_state.get("memory_page", 1) > page_count:
+            st.session_state.memory_page = page_count
+        page = st.sidebar.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, key="memory_page")
+    start = (page - 1) * MEMORY_PAGE_SIZE
+    st.sidebar.markdown(render_memory_page(tuple(matches[start:start + MEMORY_PAGE_SIZE])))
+
+
+def display_pending_memories(user_id):
+    """Offer memories suggested after earlier sessions for confirmation."""
+    pending = load_pending_memories(user_id, os.path.getmtime(user_manager.file_path))
+    if not pending:
+        return
+    st.sidebar.header("Suggested Memories")
+    st.sidebar.caption("Suggested from your earlier sessions. Uncheck any you don't want to keep.")
+    # Keyed by content, so a checkbox keeps its state when the list above it changes
+    accepted = [memory for memory in pending
+                if st.sidebar.checkbox(memory, value=True, key=f"pending_memory_{memory_id(memory)}")]
+    col1, col2 = st.sidebar.columns(2)
+    if col1.button("Save selected", key="save_pending_memories"):
+        user_manager.resolve_pending_memories(user_id, accepted)
+        st.session_state.current_state["memories"] = user_manager.get_memory_ids(user_id)
+        log_event(st.session_state.config, f"User saved {len(accepted)} suggested memories.", source="ui")
+        st.rerun()
+    if col2.button("Dismiss all", key="dismiss_pending_memories"):
+        user_manager.resolve_pending_memories(user_id, [])
+        st.rerun()
+
+
+def display_archived_memories(user_id):
+    """Search archived memories and restore them to the active set."""
+    # Only read while the toggle is on; an expander would run its body on every rerun even when collapsed
+    if not st.sidebar.toggle("Archived Memories", key="show_archived_memories"):
+        return
+    with st.sidebar.container(border=True):
+        archived = user_manager.get_archived_memories(user_id)
+        if not archived:
+            st.write("No archived memories.")
+            return
+        query = st.text_input("Search archived memories", key="archived_memory_search")
+        matches = [result for result in user_manager.search_memories(user_id, query) if result["archived"]]
+        st.caption(f"{len(matches)} of {len(archived)} archived memories")
+        for i, result in enumerate(matches[:MEMORY_PAGE_SIZE]):
+            st.write(f"{result['memory']} (used {result['hits']} times)")
+            if st.button("Restore", key=f"restore_memory_{i}"):
+                user_manager.restore_memory(user_id, result["memory"])
+                st.session_state.current_state["memories"] = user_manager.get_memory_ids(user_id)
+                log_event(st.session_state.config, "User restored an archived memory.", source="ui")
+                st.rerun()
+
+
+def display_token_usage():
+    """Show each user's token consumption today against their daily budget."""
+    if not st.sidebar.toggle("Token Usage", key="show_token_usage"):
+        return
+    with st.sidebar.container(border=True):
+        rows = usage_summary()
+        if not rows:
+            st.write("No users yet.")
+            return
+        for row in rows:
+            budget = f"{row['budget']:,}" if row["budget"] else "unlimited"
+            flag = {"soft": " (downgraded)", "hard": " (throttled)"}.get(row["status"], "")
+            st.write(f"{row['user']}: {row['used']:,} / {budget} tokens{flag}")
+
+
+def record_run_time(kind, started):
+    """Record how long a script run or fragment run took."""
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if "run_timings" not in st.session_state:
+        st.session_state.run_timings = deque(maxlen=100)
+    st.session_state.run_timings.append((kind, elapsed_ms))
+    if os.getenv("WRITING_ASSISTANT_LOG_RUN_TIME"):
+        print(f"[streamlit] {kind} run took {elapsed_ms:.1f} ms", file=sys.stderr)
+    return elapsed_ms
+
+
+def report_run_time():
+    """Report the time of this script run next to the median of recent runs."""
+    elapsed_ms = record_run_time("script", RUN_STARTED)
+    recent = sorted([ms for kind, ms in st.session_state.run_timings if kind == "script"])
+    st.sidebar.caption(f"Script run: {elapsed_ms:.0f} ms (median of last {len(recent)}: {recent[len(recent) // 2]:.0f} ms)")
+
+
 def setup_sidebar():
     """Setup the sidebar with user selection and state display."""
     # User selection
     st.sidebar.header("User Selection")
-    available_users = user_manager.get_all_users()
+    available_users = load_available_users(os.path.getmtime(user_manager.file_path))
     user_options = ["None Selected"] + available_users
 
     # Use persisted user if available, otherwise use current state user
@@ -317,28 +557,58 @@ def setup_sidebar():
         st.session_state.current_state["user"] = selected_user
         st.session_state.persisted_user = selected_user  # Persist the selection
         
-        # Fetch and add user memories to state
+        # Fetch and add user memories to state, archiving cold ones first
         if selected_user != "None Selected":
-            memories = user_manager.get_memories(selected_user)
-            st.session_state.current_state["memories"] = memories
+            archived = user_manager.archive_cold_memories(selected_user)
+            if archived:
+                log_event(st.session_state.config, f"Archived {len(archived)} unused memories.", source="ui")
+            st.session_state.current_state["memories"] = user_manager.get_memory_ids(selected_user)
         else:
             st.session_state.current_state["memories"] = []
         
         st.rerun()
 
+    # Drafting options apply to the next request
+    st.sidebar.header("Drafting Options")
+    st.sidebar.toggle(
+        "Long-document mode",
+        key="long_document",
+        help="Outline first, then draft and revise sections in parallel.",
+    )
+    st.sidebar.number_input(
+        "Draft candidates",
+        min_value=1,
+        max_value=4,
+        key="num_candidates",
+        help="Draft several alternatives at once and pick one before giving feedback.",
+    )
+
     # Display current memories
-    st.sidebar.header("Current Memories")
-    if st.session_state.current_state["memories"]:
-        for i, memory in enumerate(st.session_state.current_state["memories"], 1):
-            st.sidebar.write(f"{i}. {memory}")
-    else:
-        st.sidebar.write("No memories stored yet.")
+    display_memories()
+    if selected_user != "None Selected":
+        display_pending_memories(selected_user)
+        display_archived_memories(selected_user)
+    display_token_usage()
 
     # Display graph
     with st.sidebar.expander("Graph Visualization"):
-        graph = create_chat_graph()
-        img_bytes = graph.get_graph().draw_mermaid_png()  
-        st.image(img_bytes)
+        st.image(get_graph_image())
+
+
+def display_action_log():
+    """Display the structured event log of the current thread with simple filters."""
+    col1, col2 = st.columns(2)
+    source = col1.selectbox("Source", ["all", "graph", "ui"], key="action_log_source")
+    contains = col2.text_input("Contains", key="action_log_contains")
+    events = get_event_log(st.session_state.config["configurable"]["thread_id"]).query(
+        source=None if source == "all" else source,
+        contains=contains or None,
+        limit=50,
+    )
+    if events:
+        st.json(events)
+    else:
+        st.write("No events recorded yet.")
 
 
 def setup_page_layout():
@@ -347,9 +617,13 @@ def setup_page_layout():
 
     header = st.container()
     header.title("💡 ContextCraft")
-    # Display state in collapsible box above chat
-    with header.expander("Current State", expanded=False):
-        st.json(st.session_state.current_state)
+    # State and action log are only rendered while their toggle is on
+    col1, col2, _ = header.columns([1, 1, 4])
+    if col1.toggle("Current State", key="show_state"):
+        header.json(st.session_state.current_state, expanded=False)
+    if col2.toggle("Action Log", key="show_action_log"):
+        with header.container():
+            display_action_log()
 
     header.write("""<div class='fixed-header'/>""", unsafe_allow_html=True)
 
@@ -380,6 +654,14 @@ if not os.getenv("OPENAI_API_KEY"):
     st.error("⚠️ Please set your OPENAI_API_KEY environment variable")
     st.stop()
 
+# Drain the extraction queue in this process unless a separate worker does it. Even without deferred
+# extraction, extractions that miss their deadline are queued and need a worker.
+extraction_workers = int(os.getenv("WRITING_ASSISTANT_EXTRACTION_WORKERS", "1"))
+if extraction_workers > 0:
+    start_extraction_workers(extraction_workers)
+if GRAPH_WORKERS:
+    start_graph_workers(GRAPH_WORKERS)
+
 # Initialize session state
 initialize_session_state()
 
@@ -391,3 +673,6 @@ setup_chat_interface(st)
 
 # Setup sidebar
 setup_sidebar()
+
+# Report how long this run took
+report_run_time()